@@ -0,0 +1,275 @@
+import os
+import sys
+import time
+import argparse
+import tracemalloc
+
+# Benchmarks for running the games off-device under CPython, using the
+# headless picographics/pimoroni stand-ins in this directory.
+#
+#   python host/bench.py                  run every scenario
+#   python host/bench.py pong --frames 5000
+#
+# Each scenario reports frames per second, draw calls per frame and the
+# memory allocated per frame. Absolute frame rates say nothing about the
+# RP2040, but the ratios between two runs of the same scenario do.
+
+HOST = os.path.dirname(os.path.abspath(__file__))
+sys.path[:0] = [HOST, os.path.join(os.path.dirname(HOST), "src")]
+
+import compat  # noqa: E402,F401
+import pimoroni  # noqa: E402
+
+SCENARIOS = {}
+
+def scenario(name):
+    def register(setup):
+        SCENARIOS[name] = setup
+        return setup
+    return register
+
+
+@scenario("pong")
+def pong_scenario():
+    import pong
+    from utils.physics import to_fixed
+
+    board = pong.Board()
+    board.active = True
+    board.ball.vx = to_fixed(3)
+    board.ball.vy = to_fixed(2)
+
+    # Both players sweep their paddles up and down
+    def frame(i):
+        if i % 40 < 20:
+            board.inc_p1()
+            board.dec_p2()
+        else:
+            board.dec_p1()
+            board.inc_p2()
+        pong.step(board, 0, 0)
+        board.update()
+
+    return pong.display, frame
+
+
+@scenario("pong_cpu")
+def pong_cpu_scenario():
+    import pong
+    from utils.physics import to_fixed
+
+    board = pong.Board()
+    board.active = True
+    board.ball.vx = to_fixed(3)
+    board.ball.vy = to_fixed(2)
+    cpu = pong.CpuPaddle(board, len(pong.LEVELS) - 1)
+
+    # The same as pong with the CPU on the right paddle, to compare
+    def frame(i):
+        p1 = -1 if i % 40 < 20 else 1
+        if pong.step(board, p1, cpu.move()):
+            cpu.forget()
+        board.update()
+
+    return pong.display, frame
+
+
+def make_menu(items):
+    from picographics import PicoGraphics, DISPLAY_PICO_DISPLAY, PEN_P4
+    from utils import ScrollableMenu
+
+    display = PicoGraphics(display = DISPLAY_PICO_DISPLAY, pen_type = PEN_P4, rotate = 0)
+    # Pushes as they would be on a display with working partial updates
+    menu = ScrollableMenu(display, items, partial_update = True)
+    menu.draw_list()
+    return display, menu
+
+
+@scenario("menu")
+def menu_scenario():
+    items = ["game_%02d" % i for i in range(40)]
+    display, menu = make_menu(items)
+
+    # Walk the cursor to the bottom of the list and back, one step a frame
+    def frame(i):
+        lap = i % (2 * len(items) - 2)
+        menu.move_cursor(1 if lap < len(items) - 1 else -1)
+
+    return display, frame
+
+
+@scenario("marquee")
+def marquee_scenario():
+    display, menu = make_menu(["pong", "really_very_long_filename_for_a_game", "settings"])
+    menu.selected_index = 1
+    menu.draw_list()
+
+    # Keep the long title highlighted and scroll it every frame
+    def frame(i):
+        menu.scroll_countdown = 0
+        menu.do_text_scroll()
+
+    return display, frame
+
+
+# Tile map redraws, every frame changes a handful of cells the way a grid
+# game step does, then the map is redrawn either dirty-only or in full
+TILE_SIZES = (20, 10, 5)
+CHANGES_PER_FRAME = 4
+
+def tilemap_scenario(tile_size, full):
+    import random
+    from picographics import PicoGraphics, DISPLAY_PICO_DISPLAY, PEN_P4
+    from utils import TileMap
+
+    display = PicoGraphics(display = DISPLAY_PICO_DISPLAY, pen_type = PEN_P4, rotate = 0)
+    width, height = display.get_bounds()
+    tiles = TileMap(display, width // tile_size, height // tile_size, tile_size, tile_size)
+
+    for tile in range(4):
+        tiles.define(tile, display.create_pen(60 * tile, 255 - 60 * tile, 128))
+    # One patterned tile, a hollow square
+    edge = (1 << tile_size) - 1
+    tiles.define(4, display.create_pen(255, 255, 255), 1, [edge] + [1 << (tile_size - 1) | 1] * (tile_size - 2) + [edge])
+
+    tiles.fill(0)
+    tiles.render()
+    display.update()
+    rng = random.Random(1)
+
+    def frame(i):
+        for change in range(CHANGES_PER_FRAME):
+            tiles.set(rng.randrange(tiles.cols), rng.randrange(tiles.rows), rng.randrange(5))
+        if full:
+            tiles.render_all()
+        else:
+            tiles.render()
+        display.update()
+
+    return display, frame
+
+for size in TILE_SIZES:
+    for full in (False, True):
+        name = "tiles_{}_{}".format("full" if full else "dirty", size)
+        SCENARIOS[name] = (lambda size, full: lambda: tilemap_scenario(size, full))(size, full)
+
+
+# Collision checks, N boxes wander around the screen and every box asks
+# what it overlaps each frame, through a SpatialHash or by testing every
+# other box. These report narrow-phase tests per frame.
+COLLIDE_COUNTS = (16, 64, 256)
+
+def collide_scenario(count, hashed):
+    import random
+    from picographics import PicoGraphics, DISPLAY_PICO_DISPLAY, PEN_P4
+    from utils import Box, SpatialHash
+
+    display = PicoGraphics(display = DISPLAY_PICO_DISPLAY, pen_type = PEN_P4, rotate = 0)
+    width, height = display.get_bounds()
+    rng = random.Random(1)
+
+    boxes = [Box(rng.randrange(width - 6), rng.randrange(height - 6), 6, 6) for i in range(count)]
+    speeds = [(rng.choice((-1, 1)), rng.choice((-1, 1))) for i in range(count)]
+    grid = SpatialHash(16)
+    for box in boxes:
+        grid.insert(box)
+
+    found = []
+    counts = {"checks": 0, "hits": 0}
+
+    def frame(i):
+        for box, (dx, dy) in zip(boxes, speeds):
+            box.x = (box.x + dx) % (width - 6)
+            box.y = (box.y + dy) % (height - 6)
+            grid.moved(box)
+
+        if hashed:
+            before = grid.checks
+            for box in boxes:
+                counts["hits"] += grid.query(box.x, box.y, box.w, box.h, found) - 1
+                found.clear()
+            counts["checks"] += grid.checks - before
+        else:
+            for box in boxes:
+                for other in boxes:
+                    if other is not box and other.overlaps(box.x, box.y, box.w, box.h):
+                        counts["hits"] += 1
+            counts["checks"] += count * (count - 1)
+
+    return display, frame, lambda: dict(counts)
+
+for count in COLLIDE_COUNTS:
+    for hashed in (True, False):
+        name = "collide_{}_{}".format("hash" if hashed else "naive", count)
+        SCENARIOS[name] = (lambda count, hashed: lambda: collide_scenario(count, hashed))(count, hashed)
+
+
+def run(name, frames):
+    setup = SCENARIOS[name]()
+    display, frame = setup[:2]
+    # Scenarios can count things of their own, as a function returning
+    # running totals
+    counters = setup[2] if len(setup) > 2 else dict
+
+    # Warm up so one-off setup work is not counted
+    for i in range(min(frames, 50)):
+        frame(i)
+
+    display.reset_counters()
+    counted = counters()
+    start = time.perf_counter()
+    for i in range(frames):
+        frame(i)
+    elapsed = time.perf_counter() - start
+    counted = {key: value - counted[key] for key, value in counters().items()}
+
+    calls = display.draw_calls()
+    measures = display.calls["measure_text"]
+    pushes = display.calls["update"] + display.calls["partial_update"]
+    pixels = display.pixels_written
+    pushed = display.pixels_pushed
+
+    # Allocation tracking slows everything down, so measure it in a
+    # separate pass over the same frames
+    tracemalloc.start()
+    allocated = 0
+    for i in range(frames):
+        tracemalloc.reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+        frame(i)
+        allocated += tracemalloc.get_traced_memory()[1] - before
+    tracemalloc.stop()
+
+    results = {
+        "fps": frames / elapsed,
+        "draw calls/frame": calls / frames,
+        "measure_text/frame": measures / frames,
+        "pushes/frame": pushes / frames,
+        "pixels/frame": pixels / frames,
+        "pushed pixels/frame": pushed / frames,
+        "alloc bytes/frame": allocated / frames,
+    }
+    for key, value in counted.items():
+        results[key + "/frame"] = value / frames
+    return results
+
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description = "Headless PicoGames benchmarks")
+    parser.add_argument("scenarios", nargs = "*", help = "scenarios to run, default all: " + ", ".join(sorted(SCENARIOS)))
+    parser.add_argument("--frames", type = int, default = 2000)
+    args = parser.parse_args(argv)
+
+    for name in args.scenarios:
+        if name not in SCENARIOS:
+            parser.error("unknown scenario " + name)
+
+    for name in args.scenarios or sorted(SCENARIOS):
+        results = run(name, args.frames)
+        print(name)
+        for key, value in results.items():
+            print("  %-20s %10.1f" % (key, value))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+import os
+import sys
+import json
+import shutil
+import argparse
+import subprocess
+
+# Cross-compile src/ to MicroPython bytecode, so the device loads .mpy files
+# instead of compiling every module from source at boot and game launch.
+#
+#   python host/build_mpy.py
+#   python host/build_mpy.py --mpy-cross ~/micropython/mpy-cross/build/mpy-cross
+#   mpremote cp -r mpy :
+#
+# The output goes in mpy/ next to src/ (see src/loader.py for the layout and
+# how the device picks it up), with a manifest of source hashes so modules
+# edited on the device after a build go back to being run from source.
+# Modules whose source hasn't changed since the last build are skipped.
+#
+# mpy-cross has to produce the bytecode version the firmware reads, e.g.
+# `pip install mpy-cross==1.22.2` for MicroPython 1.22.2 firmware.
+
+HOST = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HOST)
+sys.path.insert(0, os.path.join(ROOT, "src"))
+
+import loader  # noqa: E402
+
+# Where a source file (relative to src) is compiled to, relative to out
+def target(name):
+    if name.startswith("utils/"):
+        compiled = loader.LIB + "/" + name[:-3] + ".mpy"
+    else:
+        compiled = loader.GAMES + "/" + name[:-3] + ".mpy"
+    return os.path.relpath(compiled, loader.ROOT)
+
+def sources(src):
+    # loader runs before sys.path is set up, so it is always source
+    names = [file for file in os.listdir(src) if file.endswith(".py") and file != "loader.py"]
+    names += ["utils/" + file for file in os.listdir(os.path.join(src, "utils")) if file.endswith(".py")]
+    return sorted(names)
+
+def build(src, out, mpy_cross, clean = False):
+    manifest_path = os.path.join(out, "manifest.json")
+    if clean and os.path.isdir(out):
+        shutil.rmtree(out)
+
+    try:
+        with open(manifest_path) as f:
+            old = json.load(f)
+    except (OSError, ValueError):
+        old = {}
+
+    manifest = {}
+    built = 0
+    for name in sources(src):
+        source = os.path.join(src, name)
+        compiled = os.path.join(out, target(name))
+        digest = loader.source_hash(source)
+        manifest[name] = digest
+
+        if old.get(name) == digest and os.path.exists(compiled):
+            continue
+
+        os.makedirs(os.path.dirname(compiled), exist_ok = True)
+        # -s keeps the device path in tracebacks
+        subprocess.run([mpy_cross, "-s", "src/" + name, "-o", compiled, source], check = True)
+        built += 1
+
+    # Drop bytecode for sources that have been deleted
+    for name in set(old) - set(manifest):
+        compiled = os.path.join(out, target(name))
+        if os.path.exists(compiled):
+            os.remove(compiled)
+
+    with open(manifest_path, "w") as f:
+        json.dump(manifest, f, indent = 1, sort_keys = True)
+
+    print("{} modules, {} compiled, manifest in {}".format(len(manifest), built, manifest_path))
+    return manifest
+
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description = "Cross-compile src/ to .mpy bytecode")
+    parser.add_argument("--src", default = os.path.join(ROOT, "src"))
+    parser.add_argument("--out", default = os.path.join(ROOT, loader.ROOT))
+    parser.add_argument("--mpy-cross", default = "mpy-cross", help = "mpy-cross executable matching the firmware")
+    parser.add_argument("--clean", action = "store_true", help = "rebuild everything")
+    args = parser.parse_args(argv)
+
+    build(args.src, args.out, args.mpy_cross, args.clean)
+
+
+if __name__ == "__main__":
+    main()
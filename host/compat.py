@@ -0,0 +1,76 @@
+import gc
+import io
+import sys
+import time
+import types
+import traceback
+import tracemalloc
+
+# Fill in the MicroPython-only parts of the standard library so the game
+# modules can be imported unchanged under CPython.
+
+_start_ns = time.perf_counter_ns()
+
+# MicroPython tick counters wrap around at 2**30
+TICKS_PERIOD = 1 << 30
+TICKS_MAX = TICKS_PERIOD - 1
+TICKS_HALFPERIOD = TICKS_PERIOD // 2
+
+def ticks_ms():
+    return ((time.perf_counter_ns() - _start_ns) // 1000000) & TICKS_MAX
+
+def ticks_us():
+    return ((time.perf_counter_ns() - _start_ns) // 1000) & TICKS_MAX
+
+def ticks_add(ticks, delta):
+    return (ticks + delta) & TICKS_MAX
+
+def ticks_diff(ticks1, ticks2):
+    diff = (ticks1 - ticks2) & TICKS_MAX
+    return ((diff + TICKS_HALFPERIOD) & TICKS_MAX) - TICKS_HALFPERIOD
+
+def sleep_ms(ms):
+    if ms > 0:
+        time.sleep(ms / 1000)
+
+def sleep_us(us):
+    if us > 0:
+        time.sleep(us / 1000000)
+
+# The host pretends to have the same heap as an RP2040 running MicroPython
+HEAP_SIZE = 192 * 1024
+
+def mem_alloc():
+    if not tracemalloc.is_tracing():
+        return 0
+    return tracemalloc.get_traced_memory()[0]
+
+def mem_free():
+    return max(0, HEAP_SIZE - mem_alloc())
+
+def print_exception(e, file = sys.stdout):
+    traceback.print_exception(type(e), e, e.__traceback__, file = file)
+
+def const(value):
+    return value
+
+def install():
+    for name in ("ticks_ms", "ticks_us", "ticks_add", "ticks_diff", "sleep_ms", "sleep_us"):
+        if not hasattr(time, name):
+            setattr(time, name, globals()[name])
+
+    if not hasattr(gc, "mem_free"):
+        gc.mem_free = mem_free
+        gc.mem_alloc = mem_alloc
+
+    if not hasattr(sys, "print_exception"):
+        sys.print_exception = print_exception
+
+    sys.modules.setdefault("uio", io)
+
+    if "micropython" not in sys.modules:
+        micropython = types.ModuleType("micropython")
+        micropython.const = const
+        sys.modules["micropython"] = micropython
+
+install()
@@ -0,0 +1,226 @@
+import compat  # noqa: F401
+
+# Headless stand-in for Pimoroni's picographics module. Drawing happens into
+# an in-memory framebuffer holding one palette index per pixel, and every
+# drawing call is counted so benchmarks can report draw calls per frame.
+
+DISPLAY_PICO_DISPLAY = 0
+DISPLAY_PICO_DISPLAY_2 = 1
+DISPLAY_PICO_EXPLORER = 2
+
+PEN_1BIT = 0
+PEN_P4 = 1
+PEN_P8 = 2
+PEN_RGB332 = 3
+PEN_RGB565 = 4
+
+_BOUNDS = {
+    DISPLAY_PICO_DISPLAY: (240, 135),
+    DISPLAY_PICO_DISPLAY_2: (320, 240),
+    DISPLAY_PICO_EXPLORER: (240, 240),
+}
+
+_PALETTE_SIZE = {
+    PEN_1BIT: 2,
+    PEN_P4: 16,
+    PEN_P8: 256,
+}
+
+# bitmap8 glyphs are 5 pixels wide with 1 pixel of spacing, 8 pixels high
+GLYPH_WIDTH = 5
+GLYPH_HEIGHT = 7
+
+COUNTED = ("clear", "rectangle", "circle", "line", "pixel", "pixel_span", "text", "measure_text", "update", "partial_update", "create_pen", "set_pen")
+
+
+class PicoGraphics:
+    def __init__(self, display = DISPLAY_PICO_DISPLAY, pen_type = PEN_P4, rotate = 0, **kwargs):
+        width, height = _BOUNDS[display]
+        if rotate in (90, 270):
+            width, height = height, width
+
+        self.width = width
+        self.height = height
+        self.pen_type = pen_type
+        self.buffer = bytearray(width * height)
+
+        palette_size = _PALETTE_SIZE.get(pen_type, 16)
+        self.palette = [(0, 0, 0)] * palette_size
+        self.palette_used = [False] * palette_size
+
+        self.pen = 0
+        self.font = "bitmap8"
+        self.backlight = 1.0
+        self.clip = (0, 0, width, height)
+
+        self.calls = dict.fromkeys(COUNTED, 0)
+        self.pixels_written = 0
+        # Pixels sent to the screen by update() and partial_update()
+        self.pixels_pushed = 0
+        self.frames = 0
+
+    # Instrumentation
+
+    def reset_counters(self):
+        for name in self.calls:
+            self.calls[name] = 0
+        self.pixels_written = 0
+        self.pixels_pushed = 0
+
+    def draw_calls(self):
+        return sum(count for name, count in self.calls.items() if name not in ("update", "partial_update", "set_pen", "measure_text"))
+
+    def pixel_at(self, x, y):
+        return self.buffer[y * self.width + x]
+
+    # Configuration
+
+    def get_bounds(self):
+        return self.width, self.height
+
+    def set_backlight(self, brightness):
+        self.backlight = brightness
+
+    def set_font(self, font):
+        self.font = font
+
+    def set_clip(self, x, y, w, h):
+        x1 = max(0, x)
+        y1 = max(0, y)
+        x2 = min(self.width, x + w)
+        y2 = min(self.height, y + h)
+        self.clip = (x1, y1, max(0, x2 - x1), max(0, y2 - y1))
+
+    def remove_clip(self):
+        self.clip = (0, 0, self.width, self.height)
+
+    # Palette
+
+    def create_pen(self, r, g, b):
+        self.calls["create_pen"] += 1
+        for index, used in enumerate(self.palette_used):
+            if not used:
+                self.palette[index] = (r, g, b)
+                self.palette_used[index] = True
+                return index
+        raise ValueError("create_pen failed. No matching colour or space in palette!")
+
+    def update_pen(self, index, r, g, b):
+        self.palette[index] = (r, g, b)
+        self.palette_used[index] = True
+
+    def reset_pen(self, index):
+        self.palette[index] = (0, 0, 0)
+        self.palette_used[index] = False
+
+    def set_pen(self, pen):
+        self.calls["set_pen"] += 1
+        self.pen = pen
+
+    # Drawing
+
+    def _span(self, x, y, length):
+        cx, cy, cw, ch = self.clip
+        if y < cy or y >= cy + ch:
+            return
+        x1 = max(x, cx)
+        x2 = min(x + length, cx + cw)
+        if x2 <= x1:
+            return
+        start = y * self.width
+        self.buffer[start + x1:start + x2] = bytes((self.pen,)) * (x2 - x1)
+        self.pixels_written += x2 - x1
+
+    def clear(self):
+        self.calls["clear"] += 1
+        cx, cy, cw, ch = self.clip
+        for y in range(cy, cy + ch):
+            self._span(cx, y, cw)
+
+    def pixel(self, x, y):
+        self.calls["pixel"] += 1
+        self._span(x, y, 1)
+
+    def pixel_span(self, x, y, length):
+        self.calls["pixel_span"] += 1
+        self._span(x, y, length)
+
+    def rectangle(self, x, y, w, h):
+        self.calls["rectangle"] += 1
+        for row in range(max(y, 0), min(y + h, self.height)):
+            self._span(x, row, w)
+
+    def circle(self, x, y, r):
+        self.calls["circle"] += 1
+        r2 = r * r
+        for dy in range(-r, r + 1):
+            dx = 0
+            while (dx + 1) * (dx + 1) + dy * dy <= r2:
+                dx += 1
+            self._span(x - dx, y + dy, 2 * dx + 1)
+
+    def line(self, x1, y1, x2, y2, thickness = 1):
+        self.calls["line"] += 1
+        dx = abs(x2 - x1)
+        dy = -abs(y2 - y1)
+        sx = 1 if x1 < x2 else -1
+        sy = 1 if y1 < y2 else -1
+        err = dx + dy
+        while True:
+            self._span(x1, y1, 1)
+            if x1 == x2 and y1 == y2:
+                break
+            e2 = 2 * err
+            if e2 >= dy:
+                err += dy
+                x1 += sx
+            if e2 <= dx:
+                err += dx
+                y1 += sy
+
+    def measure_text(self, text, scale = 2, spacing = 1):
+        self.calls["measure_text"] += 1
+        return self._measure(text, scale, spacing)
+
+    def _measure(self, text, scale, spacing):
+        if not text:
+            return 0
+        return len(text) * (GLYPH_WIDTH + spacing) * scale - spacing * scale
+
+    def text(self, text, x, y, wordwrap = 0x7fffffff, scale = 2, angle = 0, spacing = 1):
+        self.calls["text"] += 1
+        text = str(text)
+        advance = (GLYPH_WIDTH + spacing) * scale
+        line_height = (GLYPH_HEIGHT + 1) * scale
+
+        # Wrap on whole words like the bitmap font renderer does
+        lines = []
+        for paragraph in text.split("\n"):
+            line = ""
+            for word in paragraph.split(" "):
+                candidate = word if not line else line + " " + word
+                if line and self._measure(candidate, scale, spacing) > wordwrap:
+                    lines.append(line)
+                    line = word
+                else:
+                    line = candidate
+            lines.append(line)
+
+        # Glyphs are drawn as solid cells, which is enough to track coverage
+        for row, line in enumerate(lines):
+            top = y + row * line_height
+            for column, char in enumerate(line):
+                if char != " ":
+                    left = x + column * advance
+                    for dy in range(GLYPH_HEIGHT * scale):
+                        self._span(left, top + dy, GLYPH_WIDTH * scale)
+
+    def update(self):
+        self.calls["update"] += 1
+        self.pixels_pushed += self.width * self.height
+        self.frames += 1
+
+    def partial_update(self, x, y, w, h):
+        self.calls["partial_update"] += 1
+        self.pixels_pushed += w * h
+        self.frames += 1
@@ -0,0 +1,83 @@
+import time
+
+import compat  # noqa: F401
+
+# Headless stand-in for Pimoroni's pimoroni module. Buttons read from a
+# shared pin table that scripts driving a game (from another thread, say)
+# set with press()/release(). Recorded input sessions are replayed through
+# utils.replay instead, see host/replay.py.
+
+_pins = {}
+
+def press(*pins):
+    for pin in pins:
+        _pins[pin] = True
+
+def release(*pins):
+    for pin in pins:
+        _pins[pin] = False
+
+def release_all():
+    _pins.clear()
+
+def is_down(pin):
+    return _pins.get(pin, False)
+
+
+class Button:
+    def __init__(self, pin, invert = True, repeat_time = 200, hold_time = 1000):
+        self.pin = pin
+        self.invert = invert
+        self.repeat_time = repeat_time
+        self.hold_time = hold_time
+        self.last_state = False
+        self.pressed = False
+        self.pressed_time = 0
+        self.last_time = 0
+
+    def raw(self):
+        return _pins.get(self.pin, False)
+
+    @property
+    def is_pressed(self):
+        return self.raw()
+
+    # Mirrors the auto-repeat logic of the C++ Button driver
+    def read(self):
+        now = time.ticks_ms()
+        state = self.raw()
+        changed = state != self.last_state
+        self.last_state = state
+
+        if changed:
+            if state:
+                self.pressed_time = now
+                self.pressed = True
+                self.last_time = now
+                return True
+            self.pressed_time = 0
+            self.pressed = False
+            self.last_time = 0
+
+        if self.repeat_time == 0:
+            return False
+
+        if self.pressed:
+            repeat_rate = self.repeat_time
+            if self.hold_time > 0 and time.ticks_diff(now, self.pressed_time) > self.hold_time:
+                repeat_rate /= 3
+            if time.ticks_diff(now, self.last_time) > repeat_rate:
+                self.last_time = now
+                return True
+
+        return False
+
+
+class RGBLED:
+    def __init__(self, r, g, b, invert = True):
+        self.pins = (r, g, b)
+        self.invert = invert
+        self.rgb = (0, 0, 0)
+
+    def set_rgb(self, r, g, b):
+        self.rgb = (r, g, b)
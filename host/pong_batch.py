@@ -0,0 +1,233 @@
+import os
+import sys
+import time
+import argparse
+import itertools
+
+import numpy as np
+
+# Thousands of headless pong games at once, for tuning paddle size, paddle
+# speed and ball speed without playing them on the device.
+#
+#   python host/pong_batch.py --boards 10000 --ticks 3000 --bar-h 30 49 --speed 1 2 3
+#   python host/pong_batch.py --check 200
+#
+# PongBatch keeps one board per array element and follows utils.pong_rules
+# exactly, in the same fixed-point integers, so --check can compare it tick
+# by tick with the rules the device runs.
+
+HOST = os.path.dirname(os.path.abspath(__file__))
+sys.path[:0] = [HOST, os.path.join(os.path.dirname(HOST), "src")]
+
+import compat  # noqa: E402,F401
+from utils.physics import FP_SHIFT  # noqa: E402
+from utils.pong_rules import PongState, PADDLE_INSET, PADDLE_W, step  # noqa: E402
+
+# Pico Display bounds, less one like pong.py
+RIGHT = 239
+BOTTOM = 134
+RADIUS = 5
+
+class PongBatch:
+    # bar_h, move_delta and speed can be single values or one per board
+    def __init__(self, boards, bar_h = None, move_delta = 4, speed = 1, right = RIGHT, bottom = BOTTOM, radius = RADIUS, seed = 1):
+        self.boards = boards
+        self.rng = np.random.default_rng(seed)
+
+        def column(value):
+            return np.broadcast_to(np.asarray(value, dtype = np.int64), (boards,)).copy()
+
+        self.bar_h = column(int(bottom * 0.37) if bar_h is None else bar_h)
+        self.move_delta = column(move_delta)
+        self.speed = column(np.asarray(speed, dtype = np.float64) * (1 << FP_SHIFT))
+
+        self.center_x = right // 2
+        self.center_y = bottom // 2
+        self.r = radius << FP_SHIFT
+        self.right_wall = right << FP_SHIFT
+        self.bottom_wall = bottom << FP_SHIFT
+        self.left_face = (PADDLE_INSET + PADDLE_W) << FP_SHIFT
+        self.right_face = (right - PADDLE_INSET - PADDLE_W) << FP_SHIFT
+        self.bottom = bottom
+
+        self.x = np.zeros(boards, dtype = np.int64)
+        self.y = np.zeros(boards, dtype = np.int64)
+        self.vx = np.zeros(boards, dtype = np.int64)
+        self.vy = np.zeros(boards, dtype = np.int64)
+        self.p1 = self.center_y - self.bar_h // 2
+        self.p2 = self.center_y - self.bar_h // 2
+        self.score1 = np.zeros(boards, dtype = np.int64)
+        self.score2 = np.zeros(boards, dtype = np.int64)
+
+        # Statistics: paddle returns, and ticks since the last serve
+        self.returns = np.zeros(boards, dtype = np.int64)
+        self.rally = np.zeros(boards, dtype = np.int64)
+        self.rally_ticks = 0
+        self.rallies = 0
+
+        self.restart()
+
+    # Same as PongState.restart(), every ball heading down and right
+    def restart(self):
+        self.x[:] = self.center_x << FP_SHIFT
+        self.y[:] = self.center_y << FP_SHIFT
+        self.vx[:] = self.speed
+        self.vy[:] = self.speed
+
+    def serve(self, mask):
+        count = int(mask.sum())
+        self.x[mask] = self.center_x << FP_SHIFT
+        self.y[mask] = self.center_y << FP_SHIFT
+        speed = self.speed[mask]
+        self.vx[mask] = np.where(self.rng.integers(0, 2, count, dtype = bool), speed, -speed)
+        self.vy[mask] = np.where(self.rng.integers(0, 2, count, dtype = bool), speed, -speed)
+
+        self.p1[mask] = self.center_y - self.bar_h[mask] // 2
+        self.p2[mask] = self.center_y - self.bar_h[mask] // 2
+
+    def move_paddles(self, paddle, move):
+        delta = self.move_delta
+        lowest = self.bottom - self.bar_h - delta
+        up = np.where(paddle > delta, paddle - delta, delta)
+        down = np.where(paddle < lowest, paddle + delta, lowest)
+        return np.where(move < 0, up, np.where(move > 0, down, paddle))
+
+    # Whether the sweep of the ball's leading edge from start to end crosses
+    # plane, and the fixed-point y of the ball's center where it does
+    def swept_y(self, start, end, plane, y):
+        crosses = ((start >= plane) & (plane > end)) | ((start <= plane) & (plane < end))
+        distance = np.where(crosses, end - start, 1)
+        t = ((plane - start) << FP_SHIFT) // distance
+        return crosses, self.y + (((y - self.y) * t) >> FP_SHIFT)
+
+    def paddle_hit(self, paddle, y):
+        top = paddle << FP_SHIFT
+        return (y >= top) & (y < top + (self.bar_h << FP_SHIFT))
+
+    # Advance every board by one tick, p1 and p2 are arrays of paddle moves
+    # (-1 up, 1 down, 0 stay). Returns the boards where a point ended.
+    def step(self, p1, p2):
+        self.p1 = self.move_paddles(self.p1, p1)
+        self.p2 = self.move_paddles(self.p2, p2)
+
+        r = self.r
+        x = self.x + self.vx
+        y = self.y + self.vy
+        vx = self.vx
+
+        # Top and bottom walls
+        low = y + r > self.bottom_wall
+        high = ~low & (y - r < 0)
+        y = np.where(low, 2 * self.bottom_wall - (y + r) - r, y)
+        y = np.where(high, r - (y - r), y)
+        self.vy = np.where(low | high, -self.vy, self.vy)
+
+        # Paddle faces, swept like PongState.move_ball()
+        crosses, hit_y = self.swept_y(self.x - r, x - r, self.left_face, y)
+        left = (vx < 0) & crosses & self.paddle_hit(self.p1, hit_y)
+        crosses, hit_y = self.swept_y(self.x + r, x + r, self.right_face, y)
+        right = (vx > 0) & crosses & self.paddle_hit(self.p2, hit_y)
+
+        x = np.where(left, 2 * self.left_face - (x - r) + r, x)
+        x = np.where(right, 2 * self.right_face - (x + r) - r, x)
+        self.vx = np.where(left | right, -vx, vx)
+        self.returns += left | right
+
+        self.x = x
+        self.y = y
+
+        p2_point = x - r < 0
+        p1_point = ~p2_point & (x + r > self.right_wall)
+        self.score1 += p1_point
+        self.score2 += p2_point
+
+        self.rally += 1
+        points = p1_point | p2_point
+        if points.any():
+            self.rally_ticks += int(self.rally[points].sum())
+            self.rallies += int(points.sum())
+            self.rally[points] = 0
+            self.serve(points)
+        return points
+
+
+# Paddles that chase the ball's height, reacting on a fraction `skill` of
+# ticks, so tuning runs have rallies of realistic length
+def chase(batch, paddle, skill, rng):
+    ball = batch.y >> FP_SHIFT
+    center = paddle + batch.bar_h // 2
+    move = np.where(ball < center - batch.move_delta, -1, np.where(ball > center + batch.move_delta, 1, 0))
+    return np.where(rng.random(batch.boards) < skill, move, 0)
+
+def tune(args):
+    rng = np.random.default_rng(args.seed)
+    print("%6s %6s %6s %10s %10s %10s %14s" % ("bar_h", "delta", "speed", "points", "rally", "returns", "board ticks/s"))
+
+    for bar_h, delta, speed in itertools.product(args.bar_h, args.move_delta, args.speed):
+        batch = PongBatch(args.boards, bar_h, delta, speed, seed = args.seed)
+        start = time.perf_counter()
+        for tick in range(args.ticks):
+            batch.step(chase(batch, batch.p1, args.skill, rng), chase(batch, batch.p2, args.skill, rng))
+        elapsed = time.perf_counter() - start
+
+        # Average ticks and paddle returns per point
+        rallies = max(1, batch.rallies)
+        print("%6d %6d %6g %10d %10.1f %10.2f %14.0f" % (bar_h, delta, speed, batch.rallies, batch.rally_ticks / rallies, batch.returns.sum() / rallies, args.boards * args.ticks / elapsed))
+
+# Run the batch next to one PongState per board on the same random paddle
+# moves, until each board's first point (serves are random after that)
+def check(boards, ticks, seed):
+    rng = np.random.default_rng(seed)
+    speeds = rng.integers(1, 8, boards)
+    bar_h = rng.integers(10, 60, boards)
+    batch = PongBatch(boards, bar_h, 4, speeds, seed = seed)
+
+    states = []
+    for i in range(boards):
+        state = PongState(RIGHT, BOTTOM, bar_h = int(bar_h[i]))
+        state.ball.set_speed(int(speeds[i]))
+        state.active = True
+        states.append(state)
+
+    live = np.ones(boards, dtype = bool)
+    mismatches = 0
+    for tick in range(ticks):
+        p1 = rng.integers(-1, 2, boards)
+        p2 = rng.integers(-1, 2, boards)
+        points = batch.step(p1, p2)
+
+        for i in np.flatnonzero(live):
+            state = states[i]
+            point = step(state, int(p1[i]), int(p2[i]))
+            if bool(point) != bool(points[i]):
+                mismatches += 1
+                live[i] = False
+            elif point:
+                live[i] = False
+            elif (state.ball.x, state.ball.y, state.p1, state.p2) != (batch.x[i], batch.y[i], batch.p1[i], batch.p2[i]):
+                mismatches += 1
+                live[i] = False
+
+    print("{} boards, {} mismatches".format(boards, mismatches))
+    return mismatches == 0
+
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description = "Batched headless pong")
+    parser.add_argument("--boards", type = int, default = 4096)
+    parser.add_argument("--ticks", type = int, default = 2000)
+    parser.add_argument("--bar-h", type = int, nargs = "+", default = [49])
+    parser.add_argument("--move-delta", type = int, nargs = "+", default = [4])
+    parser.add_argument("--speed", type = float, nargs = "+", default = [1])
+    parser.add_argument("--skill", type = float, default = 0.6, help = "fraction of ticks the paddles react on")
+    parser.add_argument("--seed", type = int, default = 1)
+    parser.add_argument("--check", type = int, metavar = "BOARDS", help = "compare against utils.pong_rules instead")
+    args = parser.parse_args(argv)
+
+    if args.check:
+        sys.exit(0 if check(args.check, args.ticks, args.seed) else 1)
+    tune(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+import os
+import sys
+import time
+import random
+import struct
+import argparse
+
+# Run games off-device from recorded input sessions, so two versions of a
+# game can be timed on exactly the same play.
+#
+#   python host/replay.py generate session.rec --ticks 10000
+#   python host/replay.py play pong session.rec
+#
+# Sessions recorded on the device with utils.replay.record() play back the
+# same way. generate makes a synthetic one: press X to start, then random
+# single-button holds, then pause with X + Y and exit with B, which every
+# game in the catalog understands.
+
+HOST = os.path.dirname(os.path.abspath(__file__))
+sys.path[:0] = [HOST, os.path.join(os.path.dirname(HOST), "src")]
+
+import compat  # noqa: E402,F401
+from utils import replay  # noqa: E402
+
+# Bits of the shared InputManager, in hardware.py order
+BIT_A = 1
+BIT_B = 2
+BIT_X = 4
+BIT_Y = 8
+
+def generate(path, ticks, seed, tick_ms):
+    rng = random.Random(seed)
+    states = [0] * 10 + [BIT_X] * 5 + [0] * 120
+
+    end = [BIT_X | BIT_Y] * 5 + [0] * 5 + [BIT_B] * 5 + [0] * 5
+    while len(states) < ticks - len(end):
+        states += [rng.choice((0, BIT_A, BIT_B, BIT_X, BIT_Y))] * rng.randint(1, 60)
+    states = states[:ticks - len(end)] + end
+
+    runs = bytearray()
+    for state in states:
+        if runs and runs[-2] == state and runs[-1] < 255:
+            runs[-1] += 1
+        else:
+            runs += bytes((state, 1))
+
+    with open(path, "wb") as f:
+        f.write(struct.pack(replay.HEADER, replay.MAGIC, replay.VERSION, 0, tick_ms, seed))
+        f.write(runs)
+
+    print("{}: {} ticks, {} bytes".format(path, len(states), replay.HEADER_SIZE + len(runs)))
+
+def play(game, path):
+    module = __import__(game)
+    display = module.display
+
+    session = replay.play(path, live_after = False)
+    display.reset_counters()
+    start = time.perf_counter()
+    try:
+        module.loop()
+    except replay.ReplayFinished:
+        print("recording ended before the game exited")
+    elapsed = time.perf_counter() - start
+    replay.stop()
+
+    print("{}: {} ticks replayed in {:.2f}s, {} frames pushed, {:.1f} fps".format(game, session.ticks, elapsed, display.frames, display.frames / elapsed))
+
+    # Games that keep a profiler report their own phase timings too
+    profiler = getattr(module, "profiler", None)
+    if profiler is not None and profiler.recorded()[1]:
+        phases = ", ".join("{} {}us".format(name, profiler.average(phase)) for phase, name in enumerate(profiler.phases))
+        print("  last {} frames: worst {}us, {}".format(profiler.recorded()[1], profiler.worst_frame(), phases))
+
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description = "Replay recorded input sessions")
+    commands = parser.add_subparsers(dest = "command", required = True)
+
+    make = commands.add_parser("generate", help = "write a synthetic session")
+    make.add_argument("path")
+    make.add_argument("--ticks", type = int, default = 10000)
+    make.add_argument("--seed", type = int, default = 1)
+    make.add_argument("--tick-ms", type = int, default = 10)
+
+    run = commands.add_parser("play", help = "run a game from a session")
+    run.add_argument("game")
+    run.add_argument("path")
+
+    args = parser.parse_args(argv)
+    if args.command == "generate":
+        generate(args.path, args.ticks, args.seed, args.tick_ms)
+    else:
+        play(args.game, args.path)
+
+
+if __name__ == "__main__":
+    main()
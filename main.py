@@ -1,9 +1,23 @@
 import sys
+import time
 from uio import StringIO
 
+started = time.ticks_ms()
 sys.path.append("src")
 
+# Use bytecode compiled by host/build_mpy.py wherever it matches the source
+import loader
+loader.setup()
+loader.prepare("main_menu")
+
+from utils import boot
+boot.stage("interpreter", started)
+boot.stage("bytecode check")
+
+# The menu only brings in what it draws with, games are imported when chosen
 import main_menu
+from utils.palette import get_palette
+boot.stage("menu imported")
 
 try:
     main_menu.loop()
@@ -12,11 +26,10 @@ except Exception as e:
 
     X, Y = display.get_bounds()
 
-    display.reset_pen(0)
-    display.reset_pen(1)
+    palette = get_palette(display)
 
-    bg = display.create_pen(0, 0, 255)
-    fg = display.create_pen(120, 120, 120)
+    bg = palette.pen(0, 0, 255)
+    fg = palette.pen(120, 120, 120)
 
     display.set_pen(bg)
     display.clear()
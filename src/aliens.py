@@ -0,0 +1,424 @@
+import random
+from array import array
+
+from utils import GameRunner, Box, SpatialHash
+from utils.memory import Pool
+from utils.hardware import display, input, text_cache
+from utils.hardware import BIT_A, BIT_B, BIT_X
+from utils.hardware import WHITE, BLACK, CYAN, MAGENTA, YELLOW, GREEN, RED
+
+X, Y = display.get_bounds()
+
+TICK_MS = 10
+
+# The formation, aliens are laid out relative to its top left corner
+ROWS = 5
+COLS = 11
+ALIEN_W = 10
+ALIEN_H = 7
+SPACING_X = 14
+SPACING_Y = 10
+FORMATION_X = 20
+FORMATION_Y = 14
+# Points per alien by row, top row first
+ROW_POINTS = (30, 20, 20, 10, 10)
+ROW_PENS = (MAGENTA, CYAN, CYAN, GREEN, GREEN)
+
+# The formation takes one march step every few ticks, fewer as it thins out
+MARCH_STEP = 2
+MARCH_DROP = 4
+SLOWEST_MARCH = 30
+FASTEST_MARCH = 2
+
+PLAYER_W = 13
+PLAYER_H = 6
+PLAYER_Y = Y - PLAYER_H - 2
+PLAYER_SPEED = 2
+LIVES = 3
+
+PLAYER_SHOTS = 2
+ALIEN_SHOTS = 4
+SHOT_W = 2
+SHOT_H = 5
+PLAYER_SHOT_SPEED = 3
+ALIEN_SHOT_SPEED = 1
+# Chance in 256 per tick that an alien fires
+FIRE_CHANCE = 6
+
+# Shields are blocks that chip away one at a time
+SHIELDS = 4
+SHIELD_COLS = 5
+SHIELD_ROWS = 3
+BLOCK = 4
+SHIELD_Y = PLAYER_Y - 22
+
+# Top of the play area, the score bar is above
+TOP = 10
+
+# The score bar's labels are drawn apart from their numbers so the numbers
+# come from the text cache, the numbers start one space after the label
+SCORE_X = 2 + text_cache.prepare("SCORE ", 1)
+LIVES_X = X - 48 + text_cache.prepare("LIVES ", 1)
+
+class Game:
+    def __init__(self):
+        # Aliens live in their own hash so the formation marches by moving
+        # its offset, shields are static and bullets are few enough to test
+        # against the hashes one by one
+        self.formation = SpatialHash(16)
+        self.shields = SpatialHash(8)
+        self.aliens = [Box(column * SPACING_X, row * SPACING_Y, ALIEN_W, ALIEN_H, row) for row in range(ROWS) for column in range(COLS)]
+
+        gap = (X - SHIELDS * SHIELD_COLS * BLOCK) // (SHIELDS + 1)
+        self.blocks = []
+        for shield in range(SHIELDS):
+            left = gap + shield * (gap + SHIELD_COLS * BLOCK)
+            for row in range(SHIELD_ROWS):
+                for column in range(SHIELD_COLS):
+                    self.blocks.append(Box(left + column * BLOCK, SHIELD_Y + row * BLOCK, BLOCK, BLOCK))
+
+        self.player = Box(0, PLAYER_Y, PLAYER_W, PLAYER_H)
+
+        # Shots in flight, taken from pools the size of each side's limit
+        self.player_shots = []
+        self.alien_shots = []
+        self.player_pool = Pool(new_shot, PLAYER_SHOTS)
+        self.alien_pool = Pool(new_shot, ALIEN_SHOTS)
+
+        # Reused by the shield queries every tick
+        self.found = []
+
+        # What the last frame drew, so render() only erases and redraws what
+        # has changed since: shots as x, y pairs, shield blocks destroyed
+        # since, the formation's bounding box and the player's position
+        self.drawn_shots = array("h", [0] * 2 * (PLAYER_SHOTS + ALIEN_SHOTS))
+        self.drawn_shot_count = 0
+        self.chipped = []
+        self.drawn_box = (0, 0, 0, 0)
+        self.formation_changed = True
+        self.drawn_player_x = 0
+        self.drawn_score = -1
+        self.drawn_lives = -1
+
+        self.reset()
+
+    def reset(self):
+        self.score = 0
+        self.lives = LIVES
+        self.wave = 0
+        self.lost = False
+
+        self.shields.clear()
+        for block in self.blocks:
+            block.alive = True
+            self.shields.insert(block)
+
+        self.player.x = (X - PLAYER_W) // 2
+        self.next_wave()
+        self.invalidate()
+
+    def next_wave(self):
+        formation = self.formation
+        formation.clear()
+        formation.offset_x = FORMATION_X
+        # Every wave starts a little lower
+        formation.offset_y = FORMATION_Y + min(self.wave, 4) * MARCH_DROP
+        for alien in self.aliens:
+            alien.alive = True
+            formation.insert(alien)
+        self.alive = len(self.aliens)
+        self.measure_formation()
+
+        self.direction = 1
+        self.march_ticks = 0
+        self.formation_changed = True
+
+        while self.player_shots:
+            self.player_pool.release(self.player_shots.pop())
+        while self.alien_shots:
+            self.alien_pool.release(self.alien_shots.pop())
+
+        self.wave += 1
+
+    # The extent of the surviving aliens relative to the formation, only
+    # changes when one is shot
+    def measure_formation(self):
+        self.left = X
+        self.right = 0
+        self.bottom = 0
+        for alien in self.aliens:
+            if alien.alive:
+                self.left = min(self.left, alien.x)
+                self.right = max(self.right, alien.x + alien.w)
+                self.bottom = max(self.bottom, alien.y + alien.h)
+
+    def march_delay(self):
+        return max(FASTEST_MARCH, SLOWEST_MARCH * self.alive // len(self.aliens) - self.wave)
+
+    def march(self):
+        formation = self.formation
+        step = self.direction * MARCH_STEP
+        if formation.offset_x + self.left + step < 0 or formation.offset_x + self.right + step > X:
+            self.direction = -self.direction
+            formation.move(0, MARCH_DROP)
+        else:
+            formation.move(step, 0)
+        self.formation_changed = True
+
+        # Aliens chew through any shield blocks they march into
+        bottom = formation.offset_y + self.bottom
+        if bottom > SHIELD_Y:
+            found = self.found
+            left = formation.offset_x + self.left
+            self.shields.query(left, formation.offset_y, self.right - self.left, self.bottom, found)
+            for block in found:
+                if formation.first(block.x, block.y, block.w, block.h) is not None:
+                    self.chip(block)
+            found.clear()
+
+        if bottom >= PLAYER_Y:
+            self.lost = True
+
+    def chip(self, block):
+        self.shields.remove(block)
+        block.alive = False
+        self.chipped.append(block)
+
+    # Fire from a side's pool, nothing happens while all its shots are out
+    def fire(self, shots, pool, x, y):
+        if pool.available:
+            shot = pool.acquire()
+            shot.x = x - SHOT_W // 2
+            shot.y = y
+            shots.append(shot)
+
+    # Take shots[index] out of flight, moving the last shot into its place
+    def retire(self, shots, pool, index):
+        shot = shots[index]
+        last = shots.pop()
+        if index < len(shots):
+            shots[index] = last
+        pool.release(shot)
+
+    def alien_fire(self):
+        # Only the lowest alien in a column can shoot
+        column = random.randint(0, COLS - 1)
+        for row in range(ROWS - 1, -1, -1):
+            alien = self.aliens[row * COLS + column]
+            if alien.alive:
+                self.fire(self.alien_shots, self.alien_pool, self.formation.offset_x + alien.x + ALIEN_W // 2, self.formation.offset_y + alien.y + ALIEN_H)
+                return
+
+    # Shots are walked from the end so retiring one doesn't skip the next
+    def move_player_shots(self):
+        formation = self.formation
+        shots = self.player_shots
+        for index in range(len(shots) - 1, -1, -1):
+            shot = shots[index]
+            shot.y -= PLAYER_SHOT_SPEED
+            if shot.y < TOP:
+                self.retire(shots, self.player_pool, index)
+                continue
+
+            alien = formation.first(shot.x, shot.y, shot.w, shot.h)
+            if alien is not None:
+                formation.remove(alien)
+                alien.alive = False
+                self.retire(shots, self.player_pool, index)
+                self.score += ROW_POINTS[alien.kind]
+                self.alive -= 1
+                self.measure_formation()
+                self.formation_changed = True
+                continue
+
+            block = self.shields.first(shot.x, shot.y, shot.w, shot.h)
+            if block is not None:
+                self.chip(block)
+                self.retire(shots, self.player_pool, index)
+
+    def move_alien_shots(self):
+        player = self.player
+        shots = self.alien_shots
+        for index in range(len(shots) - 1, -1, -1):
+            shot = shots[index]
+            shot.y += ALIEN_SHOT_SPEED
+            if shot.y > Y:
+                self.retire(shots, self.alien_pool, index)
+                continue
+
+            block = self.shields.first(shot.x, shot.y, shot.w, shot.h)
+            if block is not None:
+                self.chip(block)
+                self.retire(shots, self.alien_pool, index)
+            elif player.overlaps(shot.x, shot.y, shot.w, shot.h):
+                self.retire(shots, self.alien_pool, index)
+                self.lives -= 1
+                if self.lives == 0:
+                    self.lost = True
+
+    def step(self):
+        held = input.held
+        if held & BIT_A:
+            self.player.x = max(0, self.player.x - PLAYER_SPEED)
+        elif held & BIT_B:
+            self.player.x = min(X - PLAYER_W, self.player.x + PLAYER_SPEED)
+        if input.pressed & BIT_X:
+            self.fire(self.player_shots, self.player_pool, self.player.x + PLAYER_W // 2, PLAYER_Y - SHOT_H)
+
+        self.march_ticks += 1
+        if self.march_ticks >= self.march_delay():
+            self.march_ticks = 0
+            self.march()
+
+        if random.getrandbits(8) < FIRE_CHANCE:
+            self.alien_fire()
+
+        self.move_player_shots()
+        self.move_alien_shots()
+
+        if self.alive == 0:
+            self.next_wave()
+
+    # Force the next render() to clear and redraw everything, used after
+    # anything else has been drawn over the game
+    def invalidate(self):
+        self.full_redraw = True
+
+    def redraw(self):
+        display.set_pen(BLACK)
+        display.clear()
+
+        self.drawn_score = -1
+        self.draw_status()
+        self.draw_formation()
+
+        display.set_pen(GREEN)
+        for block in self.blocks:
+            if block.alive:
+                display.rectangle(block.x, block.y, BLOCK, BLOCK)
+        self.chipped.clear()
+
+        self.draw_player()
+        self.draw_shots()
+        self.full_redraw = False
+
+    # The score bar, only when the score or lives have changed. Returns
+    # whether anything was drawn.
+    def draw_status(self):
+        if self.score == self.drawn_score and self.lives == self.drawn_lives:
+            return False
+
+        display.set_pen(BLACK)
+        display.rectangle(0, 0, X, TOP)
+        display.set_pen(WHITE)
+        display.text("SCORE", 2, 1, X, 1)
+        display.text(text_cache.number(self.score), SCORE_X, 1, X, 1)
+        display.text("LIVES", X - 48, 1, X, 1)
+        display.text(text_cache.number(self.lives), LIVES_X, 1, X, 1)
+        self.drawn_score = self.score
+        self.drawn_lives = self.lives
+        return True
+
+    def draw_formation(self):
+        left = self.formation.offset_x
+        top = self.formation.offset_y
+        for alien in self.aliens:
+            if alien.alive:
+                display.set_pen(ROW_PENS[alien.kind])
+                display.rectangle(left + alien.x, top + alien.y, ALIEN_W, ALIEN_H)
+
+        # Every alien is inside this box relative to the formation
+        self.drawn_box = (left + self.left, top, self.right - self.left, self.bottom)
+        self.formation_changed = False
+
+    def draw_player(self):
+        player = self.player
+        display.set_pen(WHITE)
+        display.rectangle(player.x, player.y + 2, PLAYER_W, PLAYER_H - 2)
+        display.rectangle(player.x + PLAYER_W // 2 - 1, player.y, 3, 2)
+        self.drawn_player_x = player.x
+
+    def draw_shots(self):
+        drawn = self.drawn_shots
+        count = 0
+        for shots, pen in ((self.player_shots, WHITE), (self.alien_shots, RED)):
+            display.set_pen(pen)
+            for shot in shots:
+                display.rectangle(shot.x, shot.y, SHOT_W, SHOT_H)
+                drawn[count] = shot.x
+                drawn[count + 1] = shot.y
+                count += 2
+        self.drawn_shot_count = count // 2
+
+    # Draw the shield blocks left in an area that has just been erased
+    def repair_shields(self, x, y, w, h):
+        found = self.found
+        self.shields.query(x, y, w, h, found)
+        if found:
+            display.set_pen(GREEN)
+            for block in found:
+                display.rectangle(block.x, block.y, BLOCK, BLOCK)
+            found.clear()
+
+    # Erase what moved or went away since the last frame and draw it again
+    # where it is now. The formation, which is most of the drawing, only
+    # changes every few ticks when it marches or loses an alien. Nothing is
+    # pushed when nothing has changed.
+    def render(self):
+        if self.full_redraw:
+            self.redraw()
+            display.update()
+            return
+
+        changed = self.draw_status()
+
+        display.set_pen(BLACK)
+        drawn = self.drawn_shots
+        for i in range(0, 2 * self.drawn_shot_count, 2):
+            display.rectangle(drawn[i], drawn[i + 1], SHOT_W, SHOT_H)
+        for block in self.chipped:
+            display.rectangle(block.x, block.y, BLOCK, BLOCK)
+
+        formation = self.formation_changed
+        box_x, box_y, box_w, box_h = self.drawn_box
+        if formation:
+            display.rectangle(box_x, box_y, box_w, box_h)
+
+        player = self.player.x != self.drawn_player_x
+        if player:
+            display.rectangle(self.drawn_player_x, PLAYER_Y, PLAYER_W, PLAYER_H)
+
+        # Anything an erased shot was touching is drawn again as well
+        for i in range(0, 2 * self.drawn_shot_count, 2):
+            x = drawn[i]
+            y = drawn[i + 1]
+            self.repair_shields(x, y, SHOT_W, SHOT_H)
+            if x < box_x + box_w and x + SHOT_W > box_x and y < box_y + box_h and y + SHOT_H > box_y:
+                formation = True
+            if self.player.overlaps(x, y, SHOT_W, SHOT_H):
+                player = True
+
+        if formation:
+            self.repair_shields(box_x, box_y, box_w, box_h)
+            self.draw_formation()
+        if player:
+            self.draw_player()
+
+        changed = changed or formation or player or self.drawn_shot_count or self.chipped
+        self.chipped.clear()
+        self.draw_shots()
+        changed = changed or self.drawn_shot_count
+
+        if changed:
+            display.update()
+
+
+def new_shot():
+    return Box(0, 0, SHOT_W, SHOT_H)
+
+
+def ended(game):
+    return "GAME OVER" if game.lost else None
+
+def loop():
+    GameRunner(Game(), ended, YELLOW, TICK_MS).run()
@@ -0,0 +1,101 @@
+import os
+import sys
+import json
+import hashlib
+import binascii
+
+# Picks precompiled bytecode over source where it is current. main.py runs
+# this before anything else is imported, so it can't use utils.
+#
+# host/build_mpy.py cross-compiles src/ into mpy/ at the root of the device:
+#
+#   mpy/manifest.json    hash of the source each .mpy was built from
+#   mpy/lib/utils/*.mpy  the utils package
+#   mpy/games/*.mpy      top level modules: the menu, settings and games
+#
+# Both directories go ahead of src on sys.path, so imports load bytecode and
+# skip compiling on the device. Bytecode is only used while it matches its
+# source: utils comes from mpy/lib only when every module in it is current
+# (a package is loaded from one directory), and an out of date top level
+# module is deleted when it is first imported, so the import falls through
+# to the source in src.
+
+ROOT = "mpy"
+MANIFEST = ROOT + "/manifest.json"
+LIB = ROOT + "/lib"
+GAMES = ROOT + "/games"
+
+# Characters of hex digest kept, host/build_mpy.py writes the same
+HASH_LENGTH = 16
+
+manifest = {}
+source = "src"
+# Top level modules already checked, name: whether bytecode is used
+checked = {}
+
+def source_hash(path):
+    digest = hashlib.sha256()
+    buffer = bytearray(512)
+    view = memoryview(buffer)
+    with open(path, "rb") as f:
+        while True:
+            count = f.readinto(buffer)
+            if not count:
+                break
+            digest.update(view[:count])
+    return binascii.hexlify(digest.digest()).decode()[:HASH_LENGTH]
+
+# Whether the bytecode for a source file (relative to src) is current
+def fresh(name):
+    expected = manifest.get(name)
+    if expected is None:
+        return False
+    try:
+        return source_hash(source + "/" + name) == expected
+    except OSError:
+        return False
+
+def utils_fresh():
+    try:
+        files = [file for file in os.listdir(source + "/utils") if file.endswith(".py")]
+    except OSError:
+        return False
+    return all(fresh("utils/" + file) for file in files)
+
+# Put the bytecode directories on sys.path. Returns whether utils is loaded
+# from bytecode.
+def setup(source_dir = "src"):
+    global manifest, source
+    source = source_dir
+    try:
+        with open(MANIFEST) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        manifest = {}
+        return False
+
+    index = sys.path.index(source) if source in sys.path else len(sys.path)
+    sys.path.insert(index, GAMES)
+
+    lib = utils_fresh()
+    if lib:
+        sys.path.insert(index, LIB)
+    return lib
+
+# Call before importing a top level module. Returns whether it will load
+# from bytecode.
+def prepare(name):
+    if name in checked:
+        return checked[name]
+
+    current = fresh(name + ".py")
+    if not current:
+        compiled = GAMES + "/" + name + ".mpy"
+        try:
+            os.remove(compiled)
+            print("[boot] removed out of date " + compiled)
+        except OSError:
+            pass
+
+    checked[name] = current
+    return current
@@ -1,45 +1,37 @@
-import os
 import time
-import random
-
-from pimoroni import Button, RGBLED
-from picographics import PicoGraphics, DISPLAY_PICO_DISPLAY, PEN_P4
 
 from utils import ScrollableMenu
+from utils import hardware
+from utils import boot
+from utils.registry import GameRegistry
+from utils.profiler import Profiler
+from utils.led_effects import Breathe
+from utils.settings_store import settings
+from utils.hardware import display, led
 
-display = PicoGraphics(display=DISPLAY_PICO_DISPLAY, pen_type=PEN_P4, rotate=0)
-
-display.set_backlight(1)
-
-display.set_font("bitmap8")
-# font_size(1) height = 7
-# font_size(2) height = 14
+display.set_backlight(settings.menu_brightness)
 
+def loop():
+    games = GameRegistry()
 
-led = RGBLED(6, 7, 8)
-led.set_rgb(0, 0, 0)
+    menu = ScrollableMenu(display, games.games, btn_prev = hardware.BUTTON_Y, btn_next = hardware.BUTTON_X, btn_sel = hardware.BUTTON_A, btn_exit = hardware.BUTTON_B, text_cache = hardware.text_cache, input = hardware.input, profiler = Profiler(), partial_update = hardware.partial_update)
 
-# Definition of the Button class constructor
-# Button(uint pin, Polarity polarity=Polarity::ACTIVE_LOW, uint32_t repeat_time=200, uint32_t hold_time=1000)
+    # The LED slowly pulses while the menu is waiting for a choice
+    glow = Breathe(led)
+    background = ((40, glow.step),)
 
-def load_libraries():
-    for file in os.listdir("src"):
-        if file.endswith(".py") and file not in __file__ and file != "settings.py":
-            yield file.replace(".py", "")
-    
-    # We want the settings option to be at the end of the list
-    yield "settings"
+    # Everything the menu needs is loaded, it is drawn next
+    boot.stage("menu ready")
 
-def loop():
-    games = list(load_libraries())
+    while True:
+        game = menu.get_selection(background)
+        glow.off()
 
-    menu = ScrollableMenu(display, games)
+        if game is not False:
+            games.launch(games[game])
 
-    while True:
-        game = menu.get_selection()
-        if game != False:
-            m = __import__("src/" + games[game])
-            m.loop()
+            # Games share the display, put back what they may have changed
+            display.set_backlight(settings.menu_brightness)
 
         time.sleep(0.1)
 
@@ -1,103 +1,39 @@
 import time
-import random
 
-from pimoroni import Button, RGBLED
-from picographics import PicoGraphics, DISPLAY_PICO_DISPLAY, PEN_P4
-
-display = PicoGraphics(display=DISPLAY_PICO_DISPLAY, pen_type=PEN_P4, rotate=0)
-
-display.set_backlight(0.5)
-display.set_font("bitmap8")
-
-led = RGBLED(6, 7, 8)
-led.set_rgb(0, 0, 0)
+from utils.dual_core import DualCoreLoop
+from utils.memory import GCPacer
+from utils.settings_store import settings
+from utils.profiler import Profiler, PHASE_INPUT, PHASE_PHYSICS, PHASE_CLEAR, PHASE_DRAW, PHASE_PUSH
+from utils.physics import to_pixel
+from utils.pong_rules import PongState, SNAPSHOT_SIZE, step
+from utils.pong_ai import CpuPaddle, LEVELS
+from utils.hardware import display, input, text_cache
+from utils.hardware import BIT_A, BIT_B, BIT_X, BIT_Y
+from utils.hardware import WHITE, BLACK, GREEN
 
 X, Y = display.get_bounds()
 # For line drawing, stop from going OOB
 X -= 1
 Y -= 1
 
-# Button(uint pin, Polarity polarity=Polarity::ACTIVE_LOW, uint32_t repeat_time=200, uint32_t hold_time=1000)
-
-button_a = Button(12)
-button_b = Button(13)
-button_x = Button(14)
-button_y = Button(15)
-
-WHITE = display.create_pen(255, 255, 255)
-BLACK = display.create_pen(0, 0, 0)
-CYAN = display.create_pen(0, 255, 255)
-MAGENTA = display.create_pen(255, 0, 255)
-YELLOW = display.create_pen(255, 255, 0)
-GREEN = display.create_pen(0, 255, 0)
-RED = display.create_pen(180, 0, 0)
-
-class Ball:
-
-    @property
-    def center(self):
-        return self.x, self.y
-
-    @center.setter
-    def center(self, value):
-        self.x, self.y = value
-    
-    @property
-    def size(self):
-        return self.radius
-    
-    @size.setter
-    def size(self, value):
-        self.radius = value
-
-    def __init__(self, center_x = 0, center_y = 0, radius = 5, speed = 1, start_angle = 45):
-        self.speed: int = speed
-        self.speed_x: int = speed
-        self.speed_y: int = speed
-        self.angle: int = start_angle
-        self.radius: int = radius
-        self.x: int = center_x
-        self.y: int = center_y
-    
-    def __getitem__(self, key: str):
-        if hasattr(self, key):
-            return getattr(self, key)
-        else:
-            raise KeyError(f"The key {key} is not valid for type <Ball>")
-    
-    def __setitem__(self, key: str, value): # : Union[int, Tuple[int, int]]
-        if hasattr(self, key):
-            setattr(self, key, value)
-        else:
-            raise KeyError(f"The key {key} is not valid for type <Ball>")
-
-
-class Board:
+class Board(PongState):
+    # The rules come from PongState, a Board draws them on the display
     def __init__(self, ball = None):
-        # Store the center of the screen for ball placement
-        self.center_x = X // 2
-        self.center_y = Y // 2
+        super().__init__(X, Y, ball)
 
-        self.ball = ball or Ball(self.center_x, self.center_y)
         self.score_width = 70
         self.score_size = 2
-        self.level = 1
-
-        # start with a paddle size of 37% screen height
-        self.bar_h = int(Y * 0.37)
-
-        # The speed at which paddles move
-        self.move_delta = 4
-
-        # Allow player and ball movement
-        self.active = False
 
-        # Calculate start position of player paddles
-        self.p1 = self.center_y - self.bar_h // 2
-        self.p2 = self.center_y - self.bar_h // 2
-
-        self.score1 = 0
-        self.score2 = 0
+        # What was on screen after the last frame, so update() only has
+        # to erase and redraw the regions that have changed since then
+        self.full_redraw = True
+        self.drawn_x = 0
+        self.drawn_y = 0
+        self.drawn_size = 0
+        self.drawn_p1 = 0
+        self.drawn_p2 = 0
+        self.drawn_score1 = 0
+        self.drawn_score2 = 0
         
         self.reset()
         
@@ -108,52 +44,31 @@ class Board:
         display.line(X, 0, X, Y)
     
     def draw_ball(self):
-        x, y = self.ball.center
-        size = self.ball.size
-
-        def edge_detect():
-            if x + size > X or x - size < 0:
-                if self.ball.speed_x < 1:
-                    self.next_round(False)
-                else:
-                    self.next_round(True)
-            if y + size > Y or y - size < 0:
-                self.ball.speed_y *= -1
-                return True
-            
-            return False
-        
-        def player_detect():
-            if self.ball.speed_x < 0:
-                if x - size < 8 and y >= self.p1 and y < (self.p1 + self.bar_h):
-                    self.ball.speed_x *= -1
-            elif self.ball.speed_x > 0:
-                if x + size > X - 8 and y >= self.p2 and y < (self.p2 + self.bar_h):
-                    self.ball.speed_x *= -1
-
-        if self.active:
-            x += self.ball.speed_x
-            y += self.ball.speed_y
-
-            self.ball.center = x, y
-
-            if not edge_detect():
-                player_detect()
-
-        display.circle(self.ball["x"], self.ball["y"], self.ball.size)
+        display.circle(to_pixel(self.ball.x), to_pixel(self.ball.y), self.ball.radius)
     
     def draw_players(self):
         display.rectangle(4, self.p1, 4, self.bar_h)
         display.rectangle(X - 8, self.p2, 4, self.bar_h)
 
+    def scoreboard_overlaps(self, x, y, w, h):
+        score_center = self.score_width // 2
+        # The score text is drawn at y = 7 and is 7 pixels high per font size
+        return x < self.center_x + score_center and x + w > self.center_x - score_center and y < 7 + 7 * self.score_size and y + h > 7
+
+    def erase_scoreboard(self):
+        display.set_pen(BLACK)
+        display.rectangle(self.center_x - self.score_width // 2, 7, self.score_width, 7 * self.score_size)
+
     def draw_scoreboard(self):
         score_center = self.score_width // 2
         display.set_pen(WHITE)
 
         # Text measurement for score alignment
-        divider_width = display.measure_text("|", self.score_size)
-        # p1_width = display.measure_text(f"{self.score1}-", self.score_size)
-        p2_width = display.measure_text(f"{self.score2}", self.score_size)
+        score1 = text_cache.number(self.score1)
+        score2 = text_cache.number(self.score2)
+        divider_width = text_cache.prepare("|", self.score_size)
+        # p1_width = text_cache.measure(f"{self.score1}-", self.score_size)
+        p2_width = text_cache.measure(score2, self.score_size)
 
         divider_start = self.center_x
         p1_start = self.center_x - score_center + divider_width
@@ -163,68 +78,54 @@ class Board:
         # display.line(self.center_x - score_center, 3, self.center_x + score_center, 3)
 
         display.text("|", divider_start, 7, 1, self.score_size)
-        display.text(str(self.score1), p1_start, 7, 1, self.score_size)
-        display.text(str(self.score2), p2_start, 7, 1, self.score_size)
-    
-    def inc_p1(self):
-        # Move P1 (left) paddle up
-        if(self.p1 > self.move_delta):
-            self.p1 -= self.move_delta
-        else:
-            self.p1 = self.move_delta
-    
-    def dec_p1(self):
-        # Move P1 (left) paddle down
-        if(self.p1 < (Y - self.bar_h - self.move_delta)):
-            self.p1 += self.move_delta
-        else:
-            self.p1 = Y - self.bar_h - self.move_delta
-
-    def inc_p2(self):
-        # Move P2 (right) paddle up
-        if(self.p2 > self.move_delta):
-            self.p2 -= self.move_delta
-        else:
-            self.p2 = self.move_delta
-    
-    def dec_p2(self):
-        # Move P2 (right) paddle down
-        if(self.p2 < (Y - self.bar_h - self.move_delta)):
-            self.p2 += self.move_delta
-        else:
-            self.p2 = Y - self.bar_h - self.move_delta
-    
-    def next_round(self, p1_score):
-        if p1_score:
-            self.score1 += 1
-        else:
-            self.score2 += 1
-        
-        self.ball.center = self.center_x, self.center_y
-
-        self.ball.speed_x = self.ball.speed if random.randint(0, 1) else -1 * self.ball.speed
-        self.ball.speed_y = self.ball.speed if random.randint(0, 1) else -1 * self.ball.speed
-
-        self.p1 = self.center_y - self.bar_h // 2
-        self.p2 = self.center_y - self.bar_h // 2
+        display.text(score1, p1_start, 7, 1, self.score_size)
+        display.text(score2, p2_start, 7, 1, self.score_size)
     
     def start_game(self):
         self.active = True
 
-        start_text_size = display.measure_text("PLAY BALL!", 3)
+        start_text_size = text_cache.prepare("PLAY BALL!", 3)
         text_start = self.center_x - start_text_size // 2
 
         self.update()
         display.text("PLAY BALL", text_start, Y - 30, 240, 3)
         display.update()
+        self.invalidate()
 
         time.sleep(1)
 
+    # Force the next update() to clear and redraw the whole screen, used
+    # whenever something other than the board has been drawn over it
+    def invalidate(self):
+        self.full_redraw = True
+
     # update the screen
     def update(self):
+        profiler.begin()
+        if self.full_redraw:
+            self.redraw()
+        else:
+            self.redraw_changes()
+        profiler.end(PHASE_DRAW)
+
+        if profiler.overlay:
+            profiler.draw_overlay(display, WHITE, BLACK)
+            profiler.begin()
+        elif profiler.overlay_drawn:
+            # Redraw the board where the overlay was next frame
+            profiler.overlay_drawn = False
+            self.invalidate()
+
+        self.remember_drawn()
+        display.update()
+        profiler.end(PHASE_PUSH)
+        profiler.frame()
+
+    def redraw(self):
         # clear the screen
         display.set_pen(BLACK)
         display.clear()
+        profiler.end(PHASE_CLEAR)
 
         # redraw elements
         self.draw_scoreboard()
@@ -232,31 +133,102 @@ class Board:
         self.draw_box()
         self.draw_players()
         self.draw_ball()
-        display.update()
+        self.full_redraw = False
+
+    def redraw_changes(self):
+        # The old ball is erased with its bounding square, anything else
+        # that square touched has to be drawn again afterwards
+        old_size = self.drawn_size
+        old_left = self.drawn_x - old_size
+        old_top = self.drawn_y - old_size
+        old_span = 2 * old_size + 1
+
+        display.set_pen(BLACK)
+        display.rectangle(old_left, old_top, old_span, old_span)
+
+        # Erase the part of each paddle that it has moved away from
+        self.erase_paddle_span(4, self.drawn_p1, self.p1)
+        self.erase_paddle_span(X - 8, self.drawn_p2, self.p2)
+
+        scores_changed = self.score1 != self.drawn_score1 or self.score2 != self.drawn_score2
+        if scores_changed:
+            self.erase_scoreboard()
+
+        profiler.end(PHASE_CLEAR)
+
+        if scores_changed or self.scoreboard_overlaps(old_left, old_top, old_span, old_span):
+            self.draw_scoreboard()
+
+        display.set_pen(WHITE)
+
+        if old_left <= 0 or old_top <= 0 or old_left + old_span > X or old_top + old_span > Y:
+            self.draw_box()
+
+        # Paddles are only a few pixels wide, so draw them whole if the ball
+        # was erased over them, otherwise only fill in the newly covered span
+        if old_left < 8:
+            display.rectangle(4, self.p1, 4, self.bar_h)
+        else:
+            self.draw_paddle_span(4, self.drawn_p1, self.p1)
+
+        if old_left + old_span > X - 8:
+            display.rectangle(X - 8, self.p2, 4, self.bar_h)
+        else:
+            self.draw_paddle_span(X - 8, self.drawn_p2, self.p2)
+
+        self.draw_ball()
+
+    def erase_paddle_span(self, x, old, new):
+        if new > old:
+            display.rectangle(x, old, 4, min(new - old, self.bar_h))
+        elif new < old:
+            gap = min(old - new, self.bar_h)
+            display.rectangle(x, old + self.bar_h - gap, 4, gap)
+
+    def draw_paddle_span(self, x, old, new):
+        if new < old:
+            display.rectangle(x, new, 4, min(old - new, self.bar_h))
+        elif new > old:
+            gap = min(new - old, self.bar_h)
+            display.rectangle(x, new + self.bar_h - gap, 4, gap)
+
+    def remember_drawn(self):
+        self.drawn_x = to_pixel(self.ball.x)
+        self.drawn_y = to_pixel(self.ball.y)
+        self.drawn_size = self.ball.radius
+        self.drawn_p1 = self.p1
+        self.drawn_p2 = self.p2
+        self.drawn_score1 = self.score1
+        self.drawn_score2 = self.score2
     
     def reset(self):
-        self.active = False
-        self.ball = Ball(self.center_x, self.center_y)
+        self.restart()
+        self.invalidate()
         self.update()
-        text_size = display.measure_text("Use X to begin", 3)
-        text_start = self.center_x - text_size // 2
         display.set_pen(GREEN)
-        display.text("Use X to begin", text_start, Y - 60, 240, 3)
-        display.text("Use B for help", text_start, Y - 30, 240, 3)
+        lines = ("X: two players", "A: vs CPU " + LEVELS[level][0], "Y: CPU level", "B: help")
+        for i, line in enumerate(lines):
+            text_size = text_cache.prepare(line, 2)
+            display.text(line, self.center_x - text_size // 2, Y - 96 + i * 22, 240, 2)
         display.update()
+        self.invalidate()
     
     def pause(self):
-        text_size = display.measure_text("Use A to resume", 3)
+        text_size = text_cache.prepare("Use A to resume", 3)
         text_start = self.center_x - text_size // 2
         display.set_pen(GREEN)
         display.text("Use A to resume", text_start, Y - 60, 240, 3)
         display.text("Use B to exit", text_start, Y - 30, 240, 3)
         display.update()
 
+        # The prompt is drawn over the board, so redraw everything on resume
+        self.invalidate()
+
         while True:
-            if button_a.read():
+            input.sample()
+            if input.pressed & BIT_A:
                 return False
-            elif button_b.read():
+            elif input.pressed & BIT_B:
                 return True
             time.sleep(0.01)
 
@@ -272,49 +244,139 @@ def show_help():
     display.clear()
     display.set_pen(WHITE)
 
-    title_size = display.measure_text("PONG", 3)
+    title_size = text_cache.prepare("PONG", 3)
     display.text("PONG", board.center_x - title_size // 2, 0, X, 3)
     display.text("Use A & B to move l-paddle", 0, 40, X, 2)
     display.text("Use X & Y to move r-paddle", 0, 60, X, 2)
     display.text("Use X + Y to pause", 0, 80, X, 2)
+    display.text("vs CPU, it is the r-paddle", 0, 100, X, 2)
     display.text("Use B to return to game", 0, Y - 20, X, 2)
 
     display.update()
 
-    while not button_b.read():
+    input.sample()
+    while not input.pressed & BIT_B:
         time.sleep(0.01)
+        input.sample()
+
+# Fixed simulation tick, ball and paddle speeds are per tick
+TICK_MS = 10
+
+# What the simulation stops for, these screens are drawn by the main core
+PAUSE = 1
+START = 2
+HELP = 3
+SCORED = 4
+START_CPU = 5
+LEVEL = 6
+
+profiler = Profiler()
+
+# Garbage is only collected between points, never mid-rally
+memory = GCPacer()
+
+# The right paddle's CpuPaddle in a one player game, None for two players
+cpu = None
+# Index into LEVELS, kept between games
+level = 1
+
+# Runs on the second core. Only the simulation board is touched here, the
+# main core draws from the snapshots it publishes.
+def simulate():
+    start = time.ticks_us()
+    input.sample()
+    held = input.held
+    now = time.ticks_us()
+    profiler.add(PHASE_INPUT, time.ticks_diff(now, start))
+
+    # A + B together shows or hides the profiler overlay, and does nothing
+    # else that tick (A alone would start a game against the CPU)
+    if profiler.check_toggle(input, BIT_A | BIT_B):
+        return None
+
+    # Paddles move for as long as a button is held
+    if board.active:
+        if held & BIT_X:
+            if held & BIT_Y:
+                return PAUSE
+            p2 = -1
+        else:
+            p2 = 1 if held & BIT_Y else 0
+
+        if held & BIT_A:
+            p1 = -1
+        else:
+            p1 = 1 if held & BIT_B else 0
+
+        start = time.ticks_us()
+        if cpu is not None:
+            p2 = cpu.move()
+        point = step(board, p1, p2)
+        profiler.add(PHASE_PHYSICS, time.ticks_diff(time.ticks_us(), start))
+
+        if point:
+            if cpu is not None:
+                cpu.forget()
+            return SCORED
+    elif input.pressed & BIT_X:
+        return START
+    elif input.pressed & BIT_A:
+        return START_CPU
+    elif input.pressed & BIT_Y:
+        return LEVEL
+    elif input.pressed & BIT_B:
+        return HELP
+
+def render(snapshot):
+    view.read_snapshot(snapshot)
+    if view.active:
+        view.update()
+    memory.check()
 
 def loop():
-    global board
+    global board, view, cpu, level
+    display.set_backlight(settings.brightness)
+
+    # The simulation's board, and the copy of it the main core draws
     board = Board()
+    view = Board()
 
-    global button_a, button_b, button_x, button_y
-
-    while True:
-        if board.active:
-            if button_x.read():
-                if button_y.read():
-                    if board.pause():
-                        # Player has exited game
-                        break
-                board.inc_p2()
-            elif button_y.read():
-                board.dec_p2()
-
-            if button_a.read():
-                board.inc_p1()
-            elif button_b.read():
-                board.dec_p1()
-            
-            board.update()
-        elif button_x.read():
-            board.start_game()
-            button_a = Button(12, repeat_time = 1)
-            button_b = Button(13, repeat_time = 1)
-            button_x = Button(14, repeat_time = 1)
-            button_y = Button(15, repeat_time = 1)
-        elif button_b.read():
-            show_help()
-            board.reset()
+    game = DualCoreLoop(simulate, board.write_snapshot, render, SNAPSHOT_SIZE, TICK_MS)
 
-        time.sleep(0.01)
+    memory.begin_play()
+    try:
+        while True:
+            event = game.run()
+
+            if event == SCORED:
+                memory.collect()
+                continue
+
+            if event == PAUSE:
+                memory.collect()
+                if board.pause():
+                    # Player has exited game
+                    break
+            elif event == START or event == START_CPU:
+                cpu = CpuPaddle(board, level) if event == START_CPU else None
+                board.start_game()
+            elif event == LEVEL:
+                level = (level + 1) % len(LEVELS)
+                board.reset()
+            elif event == HELP:
+                show_help()
+                board.reset()
+
+            # The board was drawn over, start again from a full redraw
+            view.invalidate()
+    finally:
+        memory.end_play()
+
+    memory.report()
+
+    # Only written if the overlay was used, to spare the flash otherwise
+    if profiler.shown:
+        try:
+            profiler.dump("pong_profile.csv")
+        except OSError:
+            pass
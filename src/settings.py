@@ -1,11 +1,30 @@
-import json, os
 from utils import ScrollableMenu
+from utils import hardware
+from utils.slider_option import SliderOption
+from utils.settings_store import settings
+from utils.hardware import display
 
-settings = {
-    "brightness": 0.5
-}
+# What the settings screen offers, as (menu label, setting, slider range)
+OPTIONS = (
+    ("Brightness", "brightness", [0.1, 1, 0.1]),
+    ("Menu brightness", "menu_brightness", [0.1, 1, 0.1]),
+)
 
+def loop():
+    menu = ScrollableMenu(display, [label for label, key, slider_range in OPTIONS], btn_prev = hardware.BUTTON_Y, btn_next = hardware.BUTTON_X, btn_sel = hardware.BUTTON_A, btn_exit = hardware.BUTTON_B, text_cache = hardware.text_cache, input = hardware.input, partial_update = hardware.partial_update)
 
+    try:
+        while True:
+            choice = menu.get_selection()
+            if choice is False:
+                break
 
-def loop():
-    pass
\ No newline at end of file
+            label, key, slider_range = OPTIONS[choice]
+            # Brightness changes are previewed on the backlight as they happen
+            slider = SliderOption(display, slider_range, settings.get(key), btn_inc = hardware.BUTTON_X, btn_dec = hardware.BUTTON_Y, btn_sel = hardware.BUTTON_A, btn_exit = hardware.BUTTON_B, input = hardware.input, label = label, store = settings, key = key, on_change = display.set_backlight, partial_update = hardware.partial_update)
+            slider.get_value()
+
+            display.set_backlight(settings.menu_brightness)
+    finally:
+        # The only place settings are written, once per visit
+        settings.commit()
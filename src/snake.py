@@ -0,0 +1,227 @@
+import random
+from array import array
+
+from utils import GameRunner, TileMap
+from utils.hardware import display, input, text_cache
+from utils.hardware import BIT_A, BIT_B
+from utils.hardware import WHITE, BLACK, GREEN, RED
+
+X, Y = display.get_bounds()
+
+# Board size in cells, and cell size in pixels. The score bar sits above.
+CELL = 6
+COLS = X // CELL
+ROWS = 20
+CELLS = COLS * ROWS
+BOARD_Y = Y - ROWS * CELL
+
+# Cell contents in the occupancy map, also the tile drawn for them
+EMPTY = 0
+BODY = 1
+FOOD = 2
+
+# Directions clockwise from up, as the change in packed cell index
+UP = 0
+RIGHT = 1
+DOWN = 2
+LEFT = 3
+
+TICK_MS = 10
+# Ticks per step, the snake speeds up as it grows
+START_TICKS = 12
+FASTEST_TICKS = 5
+SPEEDUP_EVERY = 8
+
+GROW = 3
+
+# The score is drawn apart from its label so it comes from the text cache
+SCORE_X = 2 + text_cache.prepare("SCORE ", 1)
+
+class Snake:
+    # The body is a ring buffer of packed cells (row * COLS + column), oldest
+    # (the tail) to newest (the head), so a step writes one entry and moves
+    # two indexes whatever the length. The occupancy bytearray answers "is
+    # there body here" in one lookup.
+    #
+    # Free cells are kept in an array alongside each cell's position in it,
+    # so food can be placed by picking a random entry and cells can be
+    # added or removed by swapping with the last entry.
+    def __init__(self, tiles):
+        self.tiles = tiles
+
+        self.body = array("H", [0] * CELLS)
+        self.occupied = bytearray(CELLS)
+        self.free = array("H", range(CELLS))
+        self.free_index = array("H", range(CELLS))
+
+        self.reset()
+
+    def reset(self):
+        for cell in range(CELLS):
+            self.occupied[cell] = EMPTY
+            self.free[cell] = cell
+            self.free_index[cell] = cell
+        self.free_count = CELLS
+        self.tiles.fill(EMPTY)
+
+        self.head = 0
+        self.length = 0
+        self.grow = GROW
+        self.direction = RIGHT
+        self.turn = 0
+        self.score = 0
+        self.dead = False
+        self.won = False
+
+        self.add_head((ROWS // 2) * COLS + COLS // 4)
+        self.place_food()
+
+    def take(self, cell, contents):
+        # Swap the cell with the last free entry and shrink the free list
+        last = self.free[self.free_count - 1]
+        index = self.free_index[cell]
+        self.free[index] = last
+        self.free_index[last] = index
+        self.free_count -= 1
+
+        self.occupied[cell] = contents
+        self.tiles.set(cell % COLS, cell // COLS, contents)
+
+    def give_back(self, cell):
+        self.free[self.free_count] = cell
+        self.free_index[cell] = self.free_count
+        self.free_count += 1
+
+        self.occupied[cell] = EMPTY
+        self.tiles.set(cell % COLS, cell // COLS, EMPTY)
+
+    def place_food(self):
+        if self.free_count == 0:
+            self.won = True
+            return
+        self.food = self.free[random.randint(0, self.free_count - 1)]
+        self.take(self.food, FOOD)
+
+    def add_head(self, cell):
+        self.head = (self.head + 1) % CELLS
+        self.body[self.head] = cell
+        self.length += 1
+        self.take(cell, BODY)
+
+    def remove_tail(self):
+        tail = (self.head - self.length + 1) % CELLS
+        self.length -= 1
+        self.give_back(self.body[tail])
+
+    # The cell next to `cell` in `direction`, or -1 off the board
+    def neighbour(self, cell, direction):
+        if direction == UP:
+            return cell - COLS if cell >= COLS else -1
+        if direction == DOWN:
+            return cell + COLS if cell < CELLS - COLS else -1
+        column = cell % COLS
+        if direction == LEFT:
+            return cell - 1 if column > 0 else -1
+        return cell + 1 if column < COLS - 1 else -1
+
+    def step(self):
+        self.direction = (self.direction + self.turn) & 3
+        self.turn = 0
+
+        cell = self.neighbour(self.body[self.head], self.direction)
+        if cell < 0:
+            self.dead = True
+            return
+
+        # The tail moves out of the way this step unless the snake is growing
+        if self.grow:
+            self.grow -= 1
+        else:
+            self.remove_tail()
+
+        contents = self.occupied[cell]
+        if contents == BODY:
+            self.dead = True
+            return
+
+        if contents == FOOD:
+            # Food leaves the free list when placed, hand it back first
+            self.give_back(cell)
+            self.grow += GROW
+            self.score += 1
+
+        self.add_head(cell)
+        if contents == FOOD:
+            self.place_food()
+
+
+class Game:
+    def __init__(self):
+        self.tiles = TileMap(display, COLS, ROWS, CELL, CELL, 0, BOARD_Y)
+        block = [(1 << CELL) - 2] * (CELL - 1) + [0]
+        self.tiles.define(EMPTY, BLACK)
+        self.tiles.define(BODY, GREEN, BLACK, block)
+        self.tiles.define(FOOD, RED, BLACK, block)
+
+        self.snake = Snake(self.tiles)
+        self.reset()
+
+    def reset(self):
+        self.snake.reset()
+        self.ticks = 0
+        self.drawn_score = -1
+        self.invalidate()
+
+    def step_ticks(self):
+        return max(FASTEST_TICKS, START_TICKS - self.snake.score // SPEEDUP_EVERY)
+
+    def step(self):
+        # A turns left, B turns right, the latest press before a step wins
+        if input.pressed & BIT_A:
+            self.snake.turn = -1
+        elif input.pressed & BIT_B:
+            self.snake.turn = 1
+
+        self.ticks += 1
+        if self.ticks >= self.step_ticks():
+            self.ticks = 0
+            self.snake.step()
+
+    def invalidate(self):
+        self.full_redraw = True
+
+    def render(self):
+        pushed = False
+        if self.full_redraw:
+            display.set_pen(BLACK)
+            display.clear()
+            display.set_pen(WHITE)
+            display.line(0, BOARD_Y - 1, X, BOARD_Y - 1)
+            self.tiles.mark_all()
+            self.drawn_score = -1
+            self.full_redraw = False
+
+        if self.snake.score != self.drawn_score:
+            display.set_pen(BLACK)
+            display.rectangle(0, 0, X, BOARD_Y - 1)
+            display.set_pen(WHITE)
+            display.text("SCORE", 2, 3, X, 1)
+            display.text(text_cache.number(self.snake.score), SCORE_X, 3, X, 1)
+            self.drawn_score = self.snake.score
+            pushed = True
+
+        if self.tiles.render() or pushed:
+            display.update()
+
+
+# The title to end on once the snake has died or filled the board
+def ended(game):
+    snake = game.snake
+    if snake.won:
+        return "YOU WIN"
+    if snake.dead:
+        return "GAME OVER"
+    return None
+
+def loop():
+    GameRunner(Game(), ended, GREEN, TICK_MS).run()
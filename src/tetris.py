@@ -0,0 +1,302 @@
+import random
+
+from utils import GameRunner, TileMap
+from utils.hardware import display, input, text_cache, palette
+from utils.hardware import BIT_A, BIT_B, BIT_X, BIT_Y
+from utils.hardware import WHITE, BLACK, CYAN, MAGENTA, YELLOW, GREEN, RED
+
+X, Y = display.get_bounds()
+
+# Playfield size in cells, and cell size in pixels
+WIDTH = 10
+HEIGHT = 20
+CELL = 6
+
+FIELD_X = (X - WIDTH * CELL) // 2
+FIELD_Y = (Y - HEIGHT * CELL) // 2
+
+# Each playfield row is one int, column c being bit c + PAD. The bits either
+# side of the playfield are always set, they are the walls, and rows below
+# the playfield are completely set, the floor. A piece is in a legal spot
+# when none of its bits AND with the rows it covers.
+PAD = 3
+FULL = 0xfffff
+EMPTY = FULL & ~(((1 << WIDTH) - 1) << PAD)
+FLOOR = [FULL] * 4
+
+# Pieces as (box size, cells of the spawn rotation as (row, column))
+SHAPES = (
+    (4, ((1, 0), (1, 1), (1, 2), (1, 3))),  # I
+    (2, ((0, 0), (0, 1), (1, 0), (1, 1))),  # O
+    (3, ((0, 1), (1, 0), (1, 1), (1, 2))),  # T
+    (3, ((0, 1), (0, 2), (1, 0), (1, 1))),  # S
+    (3, ((0, 0), (0, 1), (1, 1), (1, 2))),  # Z
+    (3, ((0, 0), (1, 0), (1, 1), (1, 2))),  # J
+    (3, ((0, 2), (1, 0), (1, 1), (1, 2))),  # L
+)
+
+# Per piece, per rotation: a 4 row mask (bit n = column n of the piece box)
+# and the list of cells as (column, row), worked out once at import
+def build_rotations(size, cells):
+    rotations = []
+    for turn in range(4):
+        masks = [0, 0, 0, 0]
+        for row, column in cells:
+            masks[row] |= 1 << column
+        rotations.append((tuple(masks), tuple((column, row) for row, column in cells)))
+        # Rotate clockwise inside the piece box
+        cells = [(column, size - 1 - row) for row, column in cells]
+    return rotations
+
+PIECES = [build_rotations(size, cells) for size, cells in SHAPES]
+
+# Ticks between gravity steps per level, ticks are 10ms
+TICK_MS = 10
+GRAVITY = (80, 72, 63, 55, 47, 38, 30, 22, 15, 10, 8, 7, 6, 5, 4, 3, 2)
+SOFT_DROP_TICKS = 3
+LINES_PER_LEVEL = 10
+
+# Points for clearing 1 to 4 lines at once, times level + 1
+LINE_SCORES = (0, 40, 100, 300, 1200)
+
+PANEL_X = FIELD_X + WIDTH * CELL + 10
+
+class Field:
+    # The settled blocks. Occupancy lives in one int per row, the colour of
+    # each cell in a parallel bytearray per row for drawing. Rows that
+    # changed since the screen last caught up are kept as a range.
+    def __init__(self):
+        self.rows = [EMPTY] * HEIGHT + FLOOR
+        self.colors = [bytearray(WIDTH) for i in range(HEIGHT)]
+        # Highest row with anything in it
+        self.top = HEIGHT
+
+        self.dirty_top = HEIGHT
+        self.dirty_bottom = 0
+
+    def collides(self, piece, rotation, x, y):
+        masks = PIECES[piece][rotation][0]
+        rows = self.rows
+        shift = x + PAD
+        if shift < 0:
+            return True
+        for i in range(4):
+            if masks[i] and rows[y + i] & (masks[i] << shift):
+                return True
+        return False
+
+    # Settle a piece and clear any lines it completes, returns the number
+    # of lines cleared
+    def lock(self, piece, rotation, x, y):
+        masks, cells = PIECES[piece][rotation]
+        shift = x + PAD
+        for i in range(4):
+            if masks[i]:
+                self.rows[y + i] |= masks[i] << shift
+        for column, row in cells:
+            self.colors[y + row][x + column] = piece + 1
+
+        bottom = min(y + 4, HEIGHT)
+        self.top = min(self.top, y)
+        self.mark(y, bottom)
+
+        cleared = 0
+        for row in range(y, bottom):
+            if self.rows[row] == FULL:
+                cleared += 1
+        if cleared:
+            self.compact(bottom)
+        return cleared
+
+    # Drop the full rows and pull everything above them down
+    def compact(self, bottom):
+        rows = self.rows
+        kept = [i for i in range(HEIGHT) if rows[i] != FULL]
+        cleared = HEIGHT - len(kept)
+
+        self.rows = [EMPTY] * cleared + [rows[i] for i in kept] + FLOOR
+        self.colors = [bytearray(WIDTH) for i in range(cleared)] + [self.colors[i] for i in kept]
+
+        # Everything from the old top of the stack down to the lowest
+        # cleared line has moved
+        self.mark(self.top, bottom)
+        self.top += cleared
+
+    def mark(self, top, bottom):
+        self.dirty_top = min(self.dirty_top, top)
+        self.dirty_bottom = max(self.dirty_bottom, bottom)
+
+    # Copy the changed rows to the tile map, which works out which cells
+    # really need drawing
+    def sync(self, tiles):
+        for row in range(self.dirty_top, self.dirty_bottom):
+            colors = self.colors[row]
+            for column in range(WIDTH):
+                tiles.set(column, row, colors[column])
+        self.dirty_top = HEIGHT
+        self.dirty_bottom = 0
+
+
+class Game:
+    def __init__(self):
+        self.tiles = TileMap(display, WIDTH, HEIGHT, CELL, CELL, FIELD_X, FIELD_Y)
+
+        # Tile 0 is an empty cell, tile n + 1 is piece n. Blocks leave a one
+        # pixel gap on their right and bottom so they stay distinguishable.
+        self.pens = (CYAN, YELLOW, MAGENTA, GREEN, RED, palette.pen(0, 80, 255), palette.pen(255, 140, 0))
+        block = [(1 << CELL) - 2] * (CELL - 1) + [0]
+        self.tiles.define(0, BLACK)
+        for piece, pen in enumerate(self.pens):
+            self.tiles.define(piece + 1, pen, BLACK, block)
+
+        self.bag = []
+        self.reset()
+
+    def reset(self):
+        self.field = Field()
+        self.tiles.fill(0)
+
+        self.score = 0
+        self.lines = 0
+        self.level = 0
+        self.game_over = False
+
+        self.next_piece = self.draw_from_bag()
+        self.spawn()
+
+        self.gravity_ticks = 0
+        self.soft_drop_ticks = 0
+        self.invalidate()
+
+    # Pieces come out of a shuffled bag of all seven so droughts are short
+    def draw_from_bag(self):
+        if not self.bag:
+            self.bag = list(range(len(PIECES)))
+            for i in range(len(self.bag) - 1, 0, -1):
+                j = random.randint(0, i)
+                self.bag[i], self.bag[j] = self.bag[j], self.bag[i]
+        return self.bag.pop()
+
+    def spawn(self):
+        self.piece = self.next_piece
+        self.next_piece = self.draw_from_bag()
+        self.rotation = 0
+        self.x = 4 if self.piece == 1 else 3
+        self.y = 0
+        self.panel_changed = True
+
+        if self.field.collides(self.piece, self.rotation, self.x, self.y):
+            self.game_over = True
+        self.paint(self.piece + 1)
+
+    # Draw the falling piece into the tile map, or erase it with tile 0
+    def paint(self, tile):
+        x = self.x
+        y = self.y
+        for column, row in PIECES[self.piece][self.rotation][1]:
+            self.tiles.set(x + column, y + row, tile)
+
+    # Move the falling piece if it fits, returns whether it moved
+    def move(self, dx, dy, rotation):
+        if self.field.collides(self.piece, rotation, self.x + dx, self.y + dy):
+            return False
+        self.paint(0)
+        self.x += dx
+        self.y += dy
+        self.rotation = rotation
+        self.paint(self.piece + 1)
+        return True
+
+    def rotate(self):
+        rotation = (self.rotation + 1) & 3
+        # Simple wall kicks, try shifting away from whatever is in the way
+        for dx in (0, -1, 1, -2, 2):
+            if self.move(dx, 0, rotation):
+                return
+
+    def drop(self):
+        if self.move(0, 1, self.rotation):
+            return
+
+        cleared = self.field.lock(self.piece, self.rotation, self.x, self.y)
+        if cleared:
+            self.lines += cleared
+            self.score += LINE_SCORES[cleared] * (self.level + 1)
+            self.level = self.lines // LINES_PER_LEVEL
+        self.field.sync(self.tiles)
+        self.spawn()
+
+    def step(self):
+        held = input.held
+        if input.repeat & BIT_A:
+            self.move(-1, 0, self.rotation)
+        elif input.repeat & BIT_B:
+            self.move(1, 0, self.rotation)
+        if input.pressed & BIT_X:
+            self.rotate()
+
+        if held & BIT_Y:
+            self.soft_drop_ticks += 1
+            if self.soft_drop_ticks >= SOFT_DROP_TICKS:
+                self.soft_drop_ticks = 0
+                self.gravity_ticks = 0
+                self.score += 1
+                self.panel_changed = True
+                self.drop()
+                return
+
+        self.gravity_ticks += 1
+        if self.gravity_ticks >= GRAVITY[min(self.level, len(GRAVITY) - 1)]:
+            self.gravity_ticks = 0
+            self.drop()
+
+    def invalidate(self):
+        self.full_redraw = True
+
+    def render(self):
+        pushed = False
+        if self.full_redraw:
+            display.set_pen(BLACK)
+            display.clear()
+            display.set_pen(WHITE)
+            display.rectangle(FIELD_X - 2, FIELD_Y - 1, WIDTH * CELL + 4, HEIGHT * CELL + 2)
+            display.set_pen(BLACK)
+            display.rectangle(FIELD_X - 1, FIELD_Y, WIDTH * CELL + 2, HEIGHT * CELL)
+            self.tiles.mark_all()
+            self.panel_changed = True
+            self.full_redraw = False
+
+        if self.panel_changed:
+            self.draw_panel()
+            self.panel_changed = False
+            pushed = True
+
+        if self.tiles.render() or pushed:
+            display.update()
+
+    def draw_panel(self):
+        display.set_pen(BLACK)
+        display.rectangle(0, 0, FIELD_X - 2, Y)
+        display.rectangle(PANEL_X, 0, X - PANEL_X, Y)
+
+        display.set_pen(WHITE)
+        display.text("NEXT", 10, 10, X, 2)
+        display.text("SCORE", PANEL_X, 10, X, 2)
+        # The score runs far past the number cache's range and the panel is
+        # only drawn when it changes, so it is built here
+        display.text(str(self.score), PANEL_X, 28, X, 2)
+        display.text("LINES", PANEL_X, 52, X, 2)
+        display.text(text_cache.number(self.lines), PANEL_X, 70, X, 2)
+        display.text("LEVEL", PANEL_X, 94, X, 2)
+        display.text(text_cache.number(self.level), PANEL_X, 112, X, 2)
+
+        display.set_pen(self.pens[self.next_piece])
+        for column, row in PIECES[self.next_piece][0][1]:
+            display.rectangle(14 + column * CELL, 34 + row * CELL, CELL - 1, CELL - 1)
+
+
+def ended(game):
+    return "GAME OVER" if game.game_over else None
+
+def loop():
+    GameRunner(Game(), ended, GREEN, TICK_MS).run()
@@ -1,2 +1,33 @@
-from .scrollable_menu import ScrollableMenu
-from .interactable import Interactible
\ No newline at end of file
+import sys
+
+# Names exported by the package, and the submodule each one lives in.
+# Submodules are only imported the first time one of their names is used,
+# so importing anything from utils (e.g. the boot timer before the menu is
+# up) doesn't load and compile the whole package.
+LAZY = {
+    "ScrollableMenu": "scrollable_menu",
+    "Interactible": "interactable",
+    "GameLoop": "game_loop",
+    "GameRunner": "game_runner",
+    "TextCache": "text_cache",
+    "InputManager": "input_manager",
+    "Runtime": "runtime",
+    "Pool": "memory",
+    "GCPacer": "memory",
+    "TileMap": "tilemap",
+    "Box": "collision",
+    "SpatialHash": "collision",
+}
+
+# MicroPython's `from utils import hardware` asks __getattr__ before it
+# looks for a submodule, so anything not listed is imported as one
+def __getattr__(name):
+    if name.startswith("__"):
+        raise AttributeError(name)
+
+    module = "utils." + LAZY.get(name, name)
+    __import__(module)
+    module = sys.modules[module]
+    value = getattr(module, name) if name in LAZY else module
+    globals()[name] = value
+    return value
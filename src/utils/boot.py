@@ -0,0 +1,43 @@
+import time
+
+# Boot and launch timings, printed as each stage ends with how long it took
+# and the time since reset (ticks_ms counts from zero at power on):
+#
+#   [boot] interpreter: 610 ms (at 610 ms)
+#   [boot] menu shown: 95 ms (at 1342 ms)
+#   [boot] import tetris: 38 ms (at 5120 ms)
+#   [boot] tetris first frame: 21 ms (at 5141 ms)
+#
+# Stages are also kept in `stages` as (name, ms, at) for reading back over
+# the REPL, newest last.
+stages = []
+history = 32
+
+last = 0
+# The game being launched, until its first frame is drawn
+launching = None
+
+def stage(name, now = None):
+    global last
+    if now is None:
+        now = time.ticks_ms()
+
+    took = time.ticks_diff(now, last)
+    last = now
+    stages.append((name, took, now))
+    if len(stages) > history:
+        stages.pop(0)
+    print("[boot] {}: {} ms (at {} ms)".format(name, took, now))
+
+# Start timing a game launch, the registry calls this before the import
+def launch(name):
+    global last, launching
+    last = time.ticks_ms()
+    launching = name
+
+# Called by the game loops after each game's first render
+def first_frame():
+    global launching
+    if launching is not None:
+        stage(launching + " first frame")
+        launching = None
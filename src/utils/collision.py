@@ -0,0 +1,147 @@
+# Broad-phase collision for games with lots of rectangles. Boxes are put in
+# a uniform grid of buckets, so finding what overlaps a rectangle only looks
+# at the boxes in the few buckets it covers instead of every box in the game.
+
+class Box:
+    # An axis aligned rectangle in pixels, positioned relative to the
+    # SpatialHash it is in. kind is free for the game to use. The remaining
+    # slots are bookkeeping for the hash: the bucket range the box is filed
+    # under and the last query that already reported it.
+    __slots__ = ("x", "y", "w", "h", "kind", "alive", "stamp", "cx0", "cy0", "cx1", "cy1")
+
+    def __init__(self, x = 0, y = 0, w = 1, h = 1, kind = 0):
+        self.x = x
+        self.y = y
+        self.w = w
+        self.h = h
+        self.kind = kind
+        self.alive = True
+
+        self.stamp = 0
+        # Not filed under any bucket yet
+        self.cx0 = 0
+        self.cy0 = 0
+        self.cx1 = -1
+        self.cy1 = -1
+
+    def overlaps(self, x, y, w, h):
+        return self.x < x + w and x < self.x + self.w and self.y < y + h and y < self.y + self.h
+
+
+class SpatialHash:
+    # Buckets of cell_size pixels, created as boxes are filed into them.
+    #
+    # Every box in a hash shares one offset. Queries are made in screen
+    # coordinates and moved into the hash's own coordinates first, so a
+    # whole group of boxes (an alien formation) moves by changing the offset
+    # with move() and nothing has to be refiled.
+    def __init__(self, cell_size = 16):
+        self.cell_size = cell_size
+        self.buckets = {}
+
+        self.offset_x = 0
+        self.offset_y = 0
+
+        self.count = 0
+        self.stamp = 0
+        # Narrow-phase rectangle tests done, for benchmarking
+        self.checks = 0
+
+    # Buckets are keyed by one int, rows wrap every 4096 cells which only
+    # ever costs a few extra candidates, never a missed one
+    def bucket(self, cx, cy, create = False):
+        key = (cx << 12) | (cy & 0xfff)
+        bucket = self.buckets.get(key)
+        if bucket is None and create:
+            bucket = self.buckets[key] = []
+        return bucket
+
+    def insert(self, box):
+        size = self.cell_size
+        box.cx0 = box.x // size
+        box.cy0 = box.y // size
+        box.cx1 = (box.x + box.w - 1) // size
+        box.cy1 = (box.y + box.h - 1) // size
+
+        for cx in range(box.cx0, box.cx1 + 1):
+            for cy in range(box.cy0, box.cy1 + 1):
+                self.bucket(cx, cy, True).append(box)
+        self.count += 1
+
+    def remove(self, box):
+        for cx in range(box.cx0, box.cx1 + 1):
+            for cy in range(box.cy0, box.cy1 + 1):
+                bucket = self.bucket(cx, cy)
+                if bucket is not None and box in bucket:
+                    bucket.remove(box)
+
+        box.cx1 = box.cx0 - 1
+        box.cy1 = box.cy0 - 1
+        self.count -= 1
+
+    # Call after changing a box's x or y, it is only refiled if it has
+    # crossed into different buckets
+    def moved(self, box):
+        size = self.cell_size
+        if (box.x // size != box.cx0 or box.y // size != box.cy0 or
+                (box.x + box.w - 1) // size != box.cx1 or (box.y + box.h - 1) // size != box.cy1):
+            self.remove(box)
+            self.insert(box)
+
+    # Move every box in the hash at once
+    def move(self, dx, dy):
+        self.offset_x += dx
+        self.offset_y += dy
+
+    # Add the boxes overlapping a screen rectangle to out, returns how many
+    # were added
+    def query(self, x, y, w, h, out):
+        x -= self.offset_x
+        y -= self.offset_y
+        size = self.cell_size
+
+        self.stamp += 1
+        stamp = self.stamp
+        found = 0
+
+        for cx in range(x // size, (x + w - 1) // size + 1):
+            for cy in range(y // size, (y + h - 1) // size + 1):
+                bucket = self.bucket(cx, cy)
+                if not bucket:
+                    continue
+                for box in bucket:
+                    if box.stamp == stamp:
+                        continue
+                    box.stamp = stamp
+                    self.checks += 1
+                    if box.overlaps(x, y, w, h):
+                        out.append(box)
+                        found += 1
+        return found
+
+    # The first box overlapping a screen rectangle, or None
+    def first(self, x, y, w, h):
+        x -= self.offset_x
+        y -= self.offset_y
+        size = self.cell_size
+
+        self.stamp += 1
+        stamp = self.stamp
+
+        for cx in range(x // size, (x + w - 1) // size + 1):
+            for cy in range(y // size, (y + h - 1) // size + 1):
+                bucket = self.bucket(cx, cy)
+                if not bucket:
+                    continue
+                for box in bucket:
+                    if box.stamp == stamp:
+                        continue
+                    box.stamp = stamp
+                    self.checks += 1
+                    if box.overlaps(x, y, w, h):
+                        return box
+        return None
+
+    def clear(self):
+        self.buckets = {}
+        self.count = 0
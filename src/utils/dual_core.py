@@ -0,0 +1,165 @@
+import time
+from array import array
+
+from . import boot
+
+# MicroPython runs a new _thread on the RP2040's second core, CPython gets
+# an ordinary thread so the same code runs in the host stand-in
+try:
+    import threading
+except ImportError:
+    threading = None
+    import _thread
+
+def start_thread(function):
+    if threading is not None:
+        threading.Thread(target = function, daemon = True).start()
+    else:
+        _thread.start_new_thread(function, ())
+
+def allocate_lock():
+    if threading is not None:
+        return threading.Lock()
+    return _thread.allocate_lock()
+
+
+class Worker:
+    # The second core's thread, started the first time it is needed and then
+    # kept for good. On the rp2 port a new thread can't start until the last
+    # one on core 1 has completely returned, which nothing the thread sets
+    # on its way out can show, so jobs are handed to one thread that never
+    # exits. It sleeps blocked on a lock between jobs.
+    def __init__(self):
+        self.started = False
+        self.ready = allocate_lock()
+        self.ready.acquire()
+        self.job = None
+
+    def submit(self, job):
+        self.job = job
+        if not self.started:
+            self.started = True
+            start_thread(self.serve)
+        self.ready.release()
+
+    def serve(self):
+        while True:
+            self.ready.acquire()
+            job = self.job
+            self.job = None
+            job()
+
+# Shared by every DualCoreLoop, there is only one second core
+worker = Worker()
+
+
+class DualCoreLoop:
+    # Splits a game between the two cores. The second core runs simulate()
+    # at a fixed tick and, after each tick, has snapshot(buffer) copy the
+    # state the renderer needs into an integer array. This core draws the
+    # newest complete snapshot with render(buffer) as fast as it can.
+    #
+    # Snapshots are double buffered: the simulation fills the back buffer
+    # without holding the lock and only takes it to swap buffers, the
+    # renderer only takes it to copy the front buffer out. Neither core ever
+    # waits on the other for longer than a copy of `size` integers.
+    #
+    # simulate() returning anything other than None stops the simulation,
+    # and run() returns that value once the second core has finished, so
+    # screens that block (pauses, menus) are handled on this core between
+    # runs. Each run is a job for the shared Worker, no thread is started
+    # per run.
+    def __init__(self, simulate, snapshot, render, size, tick_ms = 10):
+        self.simulate = simulate
+        self.snapshot = snapshot
+        self.render = render
+        self.tick_ms = tick_ms
+
+        self.buffers = (array("l", [0] * size), array("l", [0] * size))
+        self.front = 0
+        self.frame = array("l", [0] * size)
+        self.lock = allocate_lock()
+
+        # Number of snapshots published, and rendered, in this run
+        self.published = 0
+        self.rendered = 0
+
+        self.running = False
+        self.simulating = False
+        self.result = None
+        self.error = None
+
+    def publish(self):
+        back = 1 - self.front
+        self.snapshot(self.buffers[back])
+
+        self.lock.acquire()
+        self.front = back
+        self.published += 1
+        self.lock.release()
+
+    def simulation(self):
+        try:
+            due = time.ticks_ms()
+            while self.running:
+                result = self.simulate()
+                if result is not None:
+                    self.result = result
+                    break
+
+                self.publish()
+
+                due = time.ticks_add(due, self.tick_ms)
+                delay = time.ticks_diff(due, time.ticks_ms())
+                if delay > 0:
+                    time.sleep_ms(delay)
+                elif delay < -self.tick_ms:
+                    # Far behind, don't try to catch up on missed ticks
+                    due = time.ticks_ms()
+        except Exception as e:
+            self.error = e
+        finally:
+            self.running = False
+            self.simulating = False
+
+    def run(self):
+        self.result = None
+        self.error = None
+        self.published = 0
+        self.rendered = 0
+
+        # The renderer starts from whatever state the game is in now
+        self.publish()
+
+        self.running = True
+        self.simulating = True
+        worker.submit(self.simulation)
+
+        seen = 0
+        try:
+            while self.running:
+                if self.published == seen:
+                    time.sleep_ms(1)
+                    continue
+
+                self.lock.acquire()
+                self.frame[:] = self.buffers[self.front]
+                seen = self.published
+                self.lock.release()
+
+                self.render(self.frame)
+                self.rendered += 1
+                if self.rendered == 1:
+                    boot.first_frame()
+        finally:
+            # Also when render() raises: stop the second core and wait for it
+            # to let go, so it doesn't run on behind the crash screen and the
+            # worker is free for the next run
+            self.running = False
+            while self.simulating:
+                time.sleep_ms(1)
+
+        if self.error is not None:
+            raise self.error
+
+        return self.result
@@ -0,0 +1,75 @@
+import time
+
+from . import boot
+
+class GameLoop:
+    # Runs update() at a fixed tick rate and render() once per loop pass,
+    # so game speed does not depend on how long drawing takes.
+    #
+    # update() returning True ends the loop. render() is skipped while the
+    # loop is behind schedule, up to max_frame_skip frames in a row, after
+    # which the backlog is dropped rather than trying to catch up forever.
+    def __init__(self, update, render, tick_ms = 10, max_frame_skip = 5):
+        self.update = update
+        self.render = render
+        self.tick_ms = tick_ms
+        self.max_frame_skip = max_frame_skip
+
+        self.running = False
+        self.next_tick = 0
+
+        # Counters for checking how the loop keeps up
+        self.ticks = 0
+        self.frames = 0
+        self.skipped_frames = 0
+        self.dropped_ticks = 0
+
+    # Restart the schedule from now, call after anything that blocked the
+    # loop on purpose (pause screens, start delays) so it won't fast-forward
+    def resync(self):
+        self.next_tick = time.ticks_ms()
+
+    def stop(self):
+        self.running = False
+
+    def run(self):
+        self.running = True
+        self.resync()
+        skipped = 0
+
+        while self.running:
+            steps = 0
+            while time.ticks_diff(time.ticks_ms(), self.next_tick) >= 0:
+                if self.update():
+                    self.running = False
+                    return
+
+                self.ticks += 1
+                self.next_tick = time.ticks_add(self.next_tick, self.tick_ms)
+                steps += 1
+
+                if steps > self.max_frame_skip:
+                    # Too far behind to ever catch up, forget the backlog
+                    self.dropped_ticks += -time.ticks_diff(self.next_tick, time.ticks_ms()) // self.tick_ms
+                    self.resync()
+                    break
+
+                if not self.running:
+                    return
+
+            # Only skip drawing while there is still simulation to catch up on
+            behind = time.ticks_diff(time.ticks_ms(), self.next_tick) >= 0
+            if behind and skipped < self.max_frame_skip:
+                skipped += 1
+                self.skipped_frames += 1
+                continue
+
+            skipped = 0
+            self.render()
+            self.frames += 1
+            if self.frames == 1:
+                boot.first_frame()
+
+            remaining = time.ticks_diff(self.next_tick, time.ticks_ms())
+            if remaining > 0:
+                time.sleep_ms(remaining)
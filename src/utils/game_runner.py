@@ -0,0 +1,87 @@
+import time
+
+from .game_loop import GameLoop
+from .memory import GCPacer
+from .settings_store import settings
+from .hardware import display, input, text_cache
+from .hardware import BIT_A, BIT_B, BIT_X, BIT_Y, BLACK
+
+X, Y = display.get_bounds()
+
+# Show a prompt over the game and wait for A or B, returns True for B
+def prompt(title, resume, pen):
+    display.set_pen(BLACK)
+    display.rectangle(0, Y // 2 - 34, X, 68)
+    display.set_pen(pen)
+    for i, line in enumerate((title, resume, "Use B to exit")):
+        width = text_cache.prepare(line, 2)
+        display.text(line, (X - width) // 2, Y // 2 - 30 + i * 22, X, 2)
+    display.update()
+
+    input.sample()
+    while True:
+        input.sample()
+        if input.pressed & BIT_A:
+            return False
+        elif input.pressed & BIT_B:
+            return True
+        time.sleep(0.01)
+
+
+class GameRunner:
+    # Plays a game on a GameLoop until the player exits with B. The game
+    # needs step() and render() for each tick and frame, reset() for a new
+    # go and invalidate() to redraw everything after a prompt covered it.
+    #
+    # Holding X and Y pauses. ended(game) is asked after every step and
+    # returns None while play goes on, or the title to show when it's over.
+    # Prompts are drawn in `pen`.
+    def __init__(self, game, ended, pen, tick_ms = 10):
+        self.game = game
+        self.ended = ended
+        self.pen = pen
+
+        # Garbage is only collected at breaks in play and when the heap runs low
+        self.memory = GCPacer()
+        self.loop = GameLoop(self.update, self.render, tick_ms)
+
+    # Returns True when the player chose to exit
+    def prompt(self, title, resume):
+        self.memory.collect()
+        exit = prompt(title, resume, self.pen)
+        # The prompt is drawn over the game, so redraw everything after
+        self.game.invalidate()
+        return exit
+
+    def update(self):
+        input.sample()
+
+        if input.is_held(BIT_X | BIT_Y):
+            if self.prompt("PAUSED", "Use A to resume"):
+                return True
+            self.loop.resync()
+            return False
+
+        game = self.game
+        game.step()
+
+        title = self.ended(game)
+        if title is not None:
+            game.render()
+            if self.prompt(title, "Use A to play"):
+                return True
+            game.reset()
+            self.loop.resync()
+
+    def render(self):
+        self.game.render()
+        self.memory.check()
+
+    def run(self):
+        display.set_backlight(settings.brightness)
+
+        self.memory.begin_play()
+        try:
+            self.loop.run()
+        finally:
+            self.memory.end_play()
@@ -0,0 +1,75 @@
+import gc
+
+from pimoroni import Button, RGBLED
+from picographics import PicoGraphics, DISPLAY_PICO_DISPLAY, PEN_P4
+
+from .text_cache import TextCache
+from .input_manager import InputManager
+from .palette import get_palette
+
+# The one set of hardware drivers shared by the menu and every game. Games
+# import what they need from here instead of constructing their own, so
+# there is only ever one framebuffer and one copy of the driver state.
+
+DISPLAY = DISPLAY_PICO_DISPLAY
+display = PicoGraphics(display=DISPLAY, pen_type=PEN_P4, rotate=0)
+display.set_font("bitmap8")
+# font_size(1) height = 7
+# font_size(2) height = 14
+
+WIDTH, HEIGHT = display.get_bounds()
+
+# Displays whose driver has been checked to push partial_update() regions.
+# Every driver has the method, on the others it does nothing, so drawing
+# that relies on it would never reach the screen.
+PARTIAL_UPDATE_DISPLAYS = ()
+partial_update = DISPLAY in PARTIAL_UPDATE_DISPLAYS
+
+led = RGBLED(6, 7, 8)
+led.set_rgb(0, 0, 0)
+
+# Definition of the Button class constructor
+# Button(uint pin, Polarity polarity=Polarity::ACTIVE_LOW, uint32_t repeat_time=200, uint32_t hold_time=1000)
+
+BUTTON_A = 12
+BUTTON_B = 13
+BUTTON_X = 14
+BUTTON_Y = 15
+
+button_a = Button(BUTTON_A)
+button_b = Button(BUTTON_B)
+button_x = Button(BUTTON_X)
+button_y = Button(BUTTON_Y)
+
+# Every button is sampled once per tick through this, bit n of its masks
+# being the n-th button here
+input = InputManager((button_a, button_b, button_x, button_y), (BUTTON_A, BUTTON_B, BUTTON_X, BUTTON_Y))
+
+BIT_A = input.bit(BUTTON_A)
+BIT_B = input.bit(BUTTON_B)
+BIT_X = input.bit(BUTTON_X)
+BIT_Y = input.bit(BUTTON_Y)
+
+# PEN_P4 only has 16 palette slots, all pens come from this allocator
+palette = get_palette(display)
+
+# Pens shared by all games
+WHITE = palette.pen(255, 255, 255)
+BLACK = palette.pen(0, 0, 0)
+CYAN = palette.pen(0, 255, 255)
+MAGENTA = palette.pen(255, 0, 255)
+YELLOW = palette.pen(255, 255, 0)
+GREEN = palette.pen(0, 255, 0)
+RED = palette.pen(180, 0, 0)
+
+text_cache = TextCache(display)
+
+def heap_free():
+    gc.collect()
+    return gc.mem_free()
+
+# Print and return the free heap, used to check what launching a game costs
+def heap_report(label):
+    free = heap_free()
+    print("[heap] {}: {} bytes free".format(label, free))
+    return free
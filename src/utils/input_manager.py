@@ -0,0 +1,139 @@
+import sys
+import time
+from array import array
+
+try:
+    from machine import mem32
+except ImportError:
+    mem32 = None
+
+# RP2040 SIO register holding the input level of every GPIO pin
+SIO_GPIO_IN = 0xd0000004
+
+# Event kinds in the queue, or'd with the index of the button
+EVENT_PRESSED = 0x10
+EVENT_RELEASED = 0x20
+EVENT_REPEAT = 0x30
+EVENT_KIND = 0xf0
+EVENT_BUTTON = 0x0f
+
+class InputManager:
+    # Samples every button once per tick into a bitmask, bit n being the
+    # n-th button given. Games and menus look at the sampled masks instead of
+    # reading pins themselves:
+    #
+    #   held      buttons that are down
+    #   pressed   buttons that went down this tick
+    #   released  buttons that went up this tick
+    #   repeat    pressed, plus auto-repeat pulses while held, the same timing
+    #             as pimoroni's Button.read()
+    #
+    # The same changes are also pushed to a small event queue for code that
+    # would rather handle them one at a time.
+    def __init__(self, buttons, pins, repeat_time = 200, hold_time = 1000, queue_size = 16):
+        self.buttons = buttons
+        self.pins = pins
+        self.repeat_time = repeat_time
+        self.hold_time = hold_time
+
+        # On the RP2040 all pins are read with a single register access,
+        # buttons are active low like pimoroni's Button defaults to
+        if mem32 is not None and sys.platform == "rp2":
+            self.gpio_masks = [1 << pin for pin in pins]
+        else:
+            self.gpio_masks = None
+
+        # Where sample() gets button states and the time from, swapped out
+        # by utils.replay to record or play back a session
+        self.source = self.read_state
+        self.clock = time.ticks_ms
+
+        self.held = 0
+        self.pressed = 0
+        self.released = 0
+        self.repeat = 0
+
+        self.pressed_time = array("l", [0] * len(buttons))
+        self.last_repeat = array("l", [0] * len(buttons))
+
+        self.queue = bytearray(queue_size)
+        self.queue_start = 0
+        self.queue_count = 0
+
+    # The bit for a pin number
+    def bit(self, pin):
+        return 1 << self.pins.index(pin)
+
+    def read_state(self):
+        state = 0
+        if self.gpio_masks is not None:
+            gpio = mem32[SIO_GPIO_IN]
+            for i, mask in enumerate(self.gpio_masks):
+                if not gpio & mask:
+                    state |= 1 << i
+        else:
+            for i, button in enumerate(self.buttons):
+                if button.raw():
+                    state |= 1 << i
+        return state
+
+    def sample(self):
+        self.update(self.source())
+
+    def update(self, state):
+        now = self.clock()
+        changed = state ^ self.held
+
+        self.pressed = changed & state
+        self.released = changed & self.held
+        self.held = state
+        self.repeat = self.pressed
+
+        if not (changed or state):
+            return
+
+        for i in range(len(self.buttons)):
+            bit = 1 << i
+            if self.pressed & bit:
+                self.pressed_time[i] = now
+                self.last_repeat[i] = now
+                self.push(EVENT_PRESSED | i)
+            elif self.released & bit:
+                self.push(EVENT_RELEASED | i)
+            elif state & bit and self.repeat_time > 0:
+                rate = self.repeat_time
+                if self.hold_time > 0 and time.ticks_diff(now, self.pressed_time[i]) > self.hold_time:
+                    rate //= 3
+                if time.ticks_diff(now, self.last_repeat[i]) > rate:
+                    self.last_repeat[i] = now
+                    self.repeat |= bit
+                    self.push(EVENT_REPEAT | i)
+
+    # True if every button in mask is held down
+    def is_held(self, mask):
+        return (self.held & mask) == mask
+
+    def push(self, event):
+        size = len(self.queue)
+        if self.queue_count == size:
+            # Full, drop the oldest event
+            self.queue_start = (self.queue_start + 1) % size
+            self.queue_count -= 1
+        self.queue[(self.queue_start + self.queue_count) % size] = event
+        self.queue_count += 1
+
+    # The next queued event, or None once the queue is empty
+    def poll(self):
+        if self.queue_count == 0:
+            return None
+        event = self.queue[self.queue_start]
+        self.queue_start = (self.queue_start + 1) % len(self.queue)
+        self.queue_count -= 1
+        return event
+
+    def clear(self):
+        self.queue_start = 0
+        self.queue_count = 0
+        self.pressed = 0
+        self.released = 0
+        self.repeat = 0
@@ -1,4 +1,5 @@
 from pimoroni import Button
+from .palette import get_palette
 
 class Interactible:
     def color_property(self, name, private_alias, help = ""):
@@ -9,17 +10,25 @@ class Interactible:
             if isinstance(value, int):
                 setattr(self, private_alias, value)
             else:
-                setattr(self, private_alias, self.display.create_pen(*value))
+                # Shared, deduplicated pens, freed when the game that made
+                # them exits
+                setattr(self, private_alias, get_palette(self.display).pen(*value))
         
         setattr(type(self), name, property(get_color, set_color, doc = help))
     
     def button_property(self, name, private_alias, help = ""):
         def get_button(self):
-            return getattr(self, private_alias).read()
+            button = getattr(self, private_alias)
+            if isinstance(button, int):
+                # A bit in the input manager's sampled state
+                return (self.input.repeat & button) != 0
+            return button.read()
 
         def set_button(self, value):
             if isinstance(value, Button):
                 setattr(self, private_alias, value)
+            elif getattr(self, "input", None) is not None:
+                setattr(self, private_alias, self.input.bit(value))
             else:
                 setattr(self, private_alias, Button(value))
         
@@ -0,0 +1,20 @@
+import time
+
+class Breathe:
+    # Fades the RGB LED in and out of a colour. step() works out the
+    # brightness from the clock, so it looks the same however often the
+    # runtime gets around to calling it.
+    def __init__(self, led, color = (0, 0, 64), period_ms = 3000):
+        self.led = led
+        self.r, self.g, self.b = color
+        self.period_ms = period_ms
+
+    def step(self):
+        phase = time.ticks_ms() % self.period_ms
+        half = self.period_ms // 2
+        # Triangle wave from 0 up to 255 and back down
+        level = 255 * (phase if phase < half else self.period_ms - phase) // half
+        self.led.set_rgb(self.r * level // 255, self.g * level // 255, self.b * level // 255)
+
+    def off(self):
+        self.led.set_rgb(0, 0, 0)
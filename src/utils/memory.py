@@ -0,0 +1,86 @@
+import gc
+import time
+
+class Pool:
+    # A fixed set of reusable objects, so short-lived things (bullets,
+    # particles, events) don't create garbage during play. acquire() hands
+    # out a free object, or builds a new one and counts a miss when the pool
+    # has run dry; release() puts an object back. Objects are tracked while
+    # they are out, so releasing one twice, or one this pool never handed
+    # out, raises ValueError instead of corrupting the free stack.
+    def __init__(self, factory, size):
+        self.factory = factory
+        self.items = [factory() for i in range(size)]
+        self.available = size
+        self.misses = 0
+        self.in_use = set()
+
+    def acquire(self):
+        if self.available == 0:
+            self.misses += 1
+            item = self.factory()
+        else:
+            self.available -= 1
+            item = self.items[self.available]
+        self.in_use.add(item)
+        return item
+
+    def release(self, item):
+        if item not in self.in_use:
+            raise ValueError("not acquired from this pool")
+        self.in_use.remove(item)
+
+        if self.available < len(self.items):
+            self.items[self.available] = item
+            self.available += 1
+
+
+class GCPacer:
+    # Keeps MicroPython's garbage collector from stopping the world in the
+    # middle of play. While playing, automatic collection is off and the
+    # game calls collect() at natural breaks instead: after a point, on
+    # pause, on the way back to the menu. check() is cheap to call every
+    # frame and only collects if the heap is running out regardless.
+    def __init__(self, low_water = 16 * 1024, check_every = 32):
+        self.low_water = low_water
+        self.check_every = check_every
+        self.frames = 0
+
+        self.collections = 0
+        self.forced = 0
+        self.last_us = 0
+        self.worst_us = 0
+        self.total_us = 0
+
+    def begin_play(self):
+        self.collect()
+        gc.disable()
+
+    def end_play(self):
+        gc.enable()
+        self.collect()
+
+    def collect(self):
+        start = time.ticks_us()
+        gc.collect()
+        self.last_us = time.ticks_diff(time.ticks_us(), start)
+
+        self.collections += 1
+        self.total_us += self.last_us
+        self.worst_us = max(self.worst_us, self.last_us)
+
+    def check(self):
+        self.frames += 1
+        if self.frames < self.check_every:
+            return
+
+        self.frames = 0
+        if gc.mem_free() < self.low_water:
+            self.forced += 1
+            self.collect()
+
+    def heap_free(self):
+        return gc.mem_free()
+
+    def report(self):
+        print("[gc] {} collections ({} forced), last {}us, worst {}us, total {}us, {} bytes free".format(self.collections, self.forced, self.last_us, self.worst_us, self.total_us, gc.mem_free()))
@@ -0,0 +1,90 @@
+# One allocator per display, shared by everything that draws on it
+_palettes = {}
+
+def get_palette(display):
+    palette = _palettes.get(id(display))
+    if palette is None:
+        palette = _palettes[id(display)] = Palette(display)
+    return palette
+
+
+class Palette:
+    # Hands out pens for a paletted display (PEN_P4 only has 16). Asking for
+    # a colour that already has a pen returns that pen instead of using up
+    # another slot, and every pen is reference counted so its slot is freed
+    # once nobody uses it any more. When the palette is full the nearest
+    # existing colour is used instead and a warning is printed.
+    def __init__(self, display, size = 16):
+        self.display = display
+        self.size = size
+
+        # Packed 0xRRGGBB -> pen, and per pen the colour and user count
+        self.pens = {}
+        self.colors = [-1] * size
+        self.refs = [0] * size
+
+        # Every pen handed out, in order, so a whole game's pens can be
+        # released at once with release_to()
+        self.allocations = []
+
+    def pen(self, r, g, b):
+        key = (r << 16) | (g << 8) | b
+        pen = self.pens.get(key)
+
+        if pen is None:
+            try:
+                pen = self.display.create_pen(r, g, b)
+            except ValueError:
+                pen = self.nearest(r, g, b)
+                print("[palette] full, drawing ({}, {}, {}) with pen {}".format(r, g, b, pen))
+            else:
+                self.pens[key] = pen
+                self.colors[pen] = key
+
+        self.refs[pen] += 1
+        self.allocations.append(pen)
+        return pen
+
+    def nearest(self, r, g, b):
+        best = 0
+        best_distance = -1
+        for pen, key in enumerate(self.colors):
+            if key < 0:
+                continue
+            dr = (key >> 16) - r
+            dg = ((key >> 8) & 0xff) - g
+            db = (key & 0xff) - b
+            distance = dr * dr + dg * dg + db * db
+            if best_distance < 0 or distance < best_distance:
+                best = pen
+                best_distance = distance
+        return best
+
+    def release(self, pen):
+        for i in range(len(self.allocations) - 1, -1, -1):
+            if self.allocations[i] == pen:
+                self.allocations.pop(i)
+                self.unref(pen)
+                return
+
+    def unref(self, pen):
+        if self.refs[pen] == 0:
+            return
+
+        self.refs[pen] -= 1
+        if self.refs[pen] == 0 and self.colors[pen] >= 0:
+            del self.pens[self.colors[pen]]
+            self.colors[pen] = -1
+            self.display.reset_pen(pen)
+
+    # A marker for release_to(), taken before a game starts
+    def mark(self):
+        return len(self.allocations)
+
+    # Release every pen handed out since mark was taken
+    def release_to(self, mark):
+        while len(self.allocations) > mark:
+            self.unref(self.allocations.pop())
+
+    def free(self):
+        return self.size - len(self.pens)
@@ -0,0 +1,59 @@
+# Integer fixed-point helpers for game physics. Positions and velocities are
+# stored multiplied by FP_ONE, so sub-pixel speeds work without floats and
+# without allocating a new float object for every arithmetic result.
+
+FP_SHIFT = 8
+FP_ONE = 1 << FP_SHIFT
+FP_HALF = FP_ONE >> 1
+
+def to_fixed(value):
+    return int(value * FP_ONE)
+
+# Round a fixed-point value to the nearest whole pixel
+def to_pixel(value):
+    return (value + FP_HALF) >> FP_SHIFT
+
+def fixed_mul(a, b):
+    return (a * b) >> FP_SHIFT
+
+
+class Body:
+    # A moving circle. x, y, vx and vy are fixed-point, radius is in pixels
+    # and r is the same radius in fixed-point.
+    __slots__ = ("x", "y", "vx", "vy", "radius", "r")
+
+    def __init__(self, x = 0, y = 0, vx = 0, vy = 0, radius = 0):
+        self.x = to_fixed(x)
+        self.y = to_fixed(y)
+        self.vx = to_fixed(vx)
+        self.vy = to_fixed(vy)
+        self.radius = radius
+        self.r = to_fixed(radius)
+
+    def place(self, x, y):
+        self.x = to_fixed(x)
+        self.y = to_fixed(y)
+
+
+# How far along a move from start to end a value crosses plane, as a
+# fixed-point fraction from 0 to FP_ONE, or -1 if the move does not cross it.
+# Used for swept collision, so fast objects can't step over thin obstacles.
+def sweep(start, end, plane):
+    if start >= plane > end or start <= plane < end:
+        return ((plane - start) << FP_SHIFT) // (end - start)
+    return -1
+
+
+# Reflect a position that has moved past plane back to the near side of it
+def reflect(position, plane):
+    return plane + plane - position
+
+
+# Where a position ends up between low and high after bouncing off both any
+# number of times, i.e. a straight path folded back between two walls
+def fold(position, low, high):
+    span = high - low
+    offset = (position - low) % (span + span)
+    if offset > span:
+        offset = span + span - offset
+    return low + offset
@@ -0,0 +1,95 @@
+import random
+
+from .physics import FP_SHIFT, to_fixed, fold
+
+# Difficulty levels: name, reaction delay in ticks once the ball turns, how
+# many pixels the aim can be off by, and top paddle speed in pixels per tick
+# (a paddle never moves faster than the rules' move_delta). The default
+# paddle returns a ball up to 24 pixels from its middle, so with these
+# errors the CPU misses roughly one ball in 4, 8 and 16 at the first speed.
+LEVELS = (
+    ("EASY", 30, 36, 1),
+    ("NORMAL", 15, 29, 2),
+    ("HARD", 6, 26, 4),
+)
+
+class CpuPaddle:
+    # Plays the right paddle (p2) of a PongState by returning its move for
+    # step() each tick.
+    #
+    # Where the ball will reach the paddle is worked out once, when the ball
+    # turns towards it. Bouncing off the top and bottom walls only mirrors
+    # the ball's height, so its straight-line path to the paddle face is
+    # folded back between the walls instead of simulating ahead. Every other
+    # tick is a comparison against that target, cheap enough to run next to
+    # the physics on the second core without costing frames.
+    def __init__(self, state, level = 1):
+        self.state = state
+        self.set_level(level)
+        self.forget()
+
+    def set_level(self, level):
+        self.level = level
+        self.name, self.reaction, self.error, speed = LEVELS[level]
+        self.speed = to_fixed(speed)
+        self.budget = 0
+
+    # Call after a point, the plan was for a ball that is no longer in play
+    def forget(self):
+        self.heading = 0
+        self.target = 0
+        self.wait = 0
+
+    # The pixel height of the ball's center when it reaches the paddle face
+    def predict(self):
+        state = self.state
+        ball = state.ball
+        r = ball.r
+
+        # Height along the unfolded path where x meets the face
+        face = state.right_face - r
+        y = ball.y + (face - ball.x) * ball.vy // ball.vx
+        return fold(y, r, state.bottom_wall - r) >> FP_SHIFT
+
+    # New target for the top of the paddle: the intercept give or take the
+    # level's error, or back to the middle while the ball heads away
+    def plan(self):
+        state = self.state
+        if self.heading > 0:
+            center = self.predict() + random.randint(-self.error, self.error)
+        else:
+            center = state.center_y
+
+        self.target = center - state.bar_h // 2
+        self.wait = self.reaction
+
+    # This tick's move: -1 up, 1 down or 0 to stay
+    def move(self):
+        state = self.state
+        heading = 1 if state.ball.vx > 0 else -1
+        if heading != self.heading:
+            self.heading = heading
+            self.plan()
+
+        if self.wait:
+            self.wait -= 1
+            return 0
+
+        # step() moves a paddle move_delta pixels at a time, so a slower
+        # paddle saves up speed until it has enough for a move
+        delta = state.move_delta
+        stride = delta << FP_SHIFT
+        if self.budget < stride:
+            self.budget += self.speed
+        if self.budget < stride:
+            return 0
+
+        # Close enough once the paddle is within half a move of the target
+        distance = self.target - state.p2
+        if distance + distance > delta:
+            self.budget -= stride
+            return 1
+        if distance + distance < -delta:
+            self.budget -= stride
+            return -1
+        return 0
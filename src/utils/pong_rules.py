@@ -0,0 +1,206 @@
+import random
+
+from .physics import Body, FP_SHIFT, to_fixed, fixed_mul, sweep, reflect
+
+# Pong's rules without any drawing, so games can be simulated without a
+# display: on the device by pong.Board, which adds rendering on top, and on
+# a computer for tuning (see host/pong_batch.py).
+
+# What step() reports
+NO_POINT = 0
+P1_POINT = 1
+P2_POINT = 2
+
+# Paddles are 4 pixels wide, 4 pixels in from either side
+PADDLE_INSET = 4
+PADDLE_W = 4
+
+class Ball(Body):
+    __slots__ = ("speed",)
+
+    def __init__(self, center_x = 0, center_y = 0, radius = 5, speed = 1):
+        super().__init__(center_x, center_y, speed, speed, radius)
+        self.speed = to_fixed(speed)
+
+    # Change speed in pixels per tick, keeping the direction of travel
+    def set_speed(self, speed):
+        self.speed = to_fixed(speed)
+        self.vx = self.speed if self.vx >= 0 else -self.speed
+        self.vy = self.speed if self.vy >= 0 else -self.speed
+
+
+class PongState:
+    # The playing field runs from 0 to right and bottom inclusive, in pixels
+    def __init__(self, right, bottom, ball = None, bar_h = None, move_delta = 4):
+        self.right = right
+        self.bottom = bottom
+
+        # Store the center of the screen for ball placement
+        self.center_x = right // 2
+        self.center_y = bottom // 2
+
+        self.ball = ball or Ball(self.center_x, self.center_y)
+        self.level = 1
+
+        # start with a paddle size of 37% screen height
+        self.bar_h = int(bottom * 0.37) if bar_h is None else bar_h
+
+        # The speed at which paddles move
+        self.move_delta = move_delta
+
+        # Allow player and ball movement
+        self.active = False
+
+        # Calculate start position of player paddles
+        self.p1 = self.center_y - self.bar_h // 2
+        self.p2 = self.center_y - self.bar_h // 2
+
+        self.score1 = 0
+        self.score2 = 0
+        # Set when a point ends, the break before the next serve
+        self.scored = False
+
+        # Collision planes in fixed-point: the walls and the inner faces
+        # of the two paddles
+        self.right_wall = right << FP_SHIFT
+        self.bottom_wall = bottom << FP_SHIFT
+        self.left_face = (PADDLE_INSET + PADDLE_W) << FP_SHIFT
+        self.right_face = (right - PADDLE_INSET - PADDLE_W) << FP_SHIFT
+
+    def move_ball(self):
+        ball = self.ball
+        r = ball.r
+        x = ball.x + ball.vx
+        y = ball.y + ball.vy
+
+        # Bounce off the top and bottom walls
+        if y + r > self.bottom_wall:
+            y = reflect(y + r, self.bottom_wall) - r
+            ball.vy = -ball.vy
+        elif y - r < 0:
+            y = reflect(y - r, 0) + r
+            ball.vy = -ball.vy
+
+        # Sweep the leading edge of the ball against the face of the paddle
+        # it is heading for, so it can't pass through at any speed
+        if ball.vx < 0:
+            t = sweep(ball.x - r, x - r, self.left_face)
+            if t >= 0 and self.paddle_hit(self.p1, ball.y + fixed_mul(y - ball.y, t)):
+                x = reflect(x - r, self.left_face) + r
+                ball.vx = -ball.vx
+        elif ball.vx > 0:
+            t = sweep(ball.x + r, x + r, self.right_face)
+            if t >= 0 and self.paddle_hit(self.p2, ball.y + fixed_mul(y - ball.y, t)):
+                x = reflect(x + r, self.right_face) - r
+                ball.vx = -ball.vx
+
+        ball.x = x
+        ball.y = y
+
+        if x - r < 0:
+            self.next_round(False)
+        elif x + r > self.right_wall:
+            self.next_round(True)
+
+    # Whether a ball centered at fixed-point y is level with a paddle
+    def paddle_hit(self, paddle, y):
+        top = paddle << FP_SHIFT
+        return y >= top and y < top + (self.bar_h << FP_SHIFT)
+
+    def inc_p1(self):
+        # Move P1 (left) paddle up
+        if(self.p1 > self.move_delta):
+            self.p1 -= self.move_delta
+        else:
+            self.p1 = self.move_delta
+
+    def dec_p1(self):
+        # Move P1 (left) paddle down
+        if(self.p1 < (self.bottom - self.bar_h - self.move_delta)):
+            self.p1 += self.move_delta
+        else:
+            self.p1 = self.bottom - self.bar_h - self.move_delta
+
+    def inc_p2(self):
+        # Move P2 (right) paddle up
+        if(self.p2 > self.move_delta):
+            self.p2 -= self.move_delta
+        else:
+            self.p2 = self.move_delta
+
+    def dec_p2(self):
+        # Move P2 (right) paddle down
+        if(self.p2 < (self.bottom - self.bar_h - self.move_delta)):
+            self.p2 += self.move_delta
+        else:
+            self.p2 = self.bottom - self.bar_h - self.move_delta
+
+    def next_round(self, p1_score):
+        if p1_score:
+            self.score1 += 1
+        else:
+            self.score2 += 1
+        self.scored = True
+
+        self.serve()
+
+        self.p1 = self.center_y - self.bar_h // 2
+        self.p2 = self.center_y - self.bar_h // 2
+
+    # Put the ball back in the middle heading in a random direction
+    def serve(self):
+        self.ball.place(self.center_x, self.center_y)
+        self.ball.vx = self.ball.speed if random.randint(0, 1) else -1 * self.ball.speed
+        self.ball.vy = self.ball.speed if random.randint(0, 1) else -1 * self.ball.speed
+
+    # Back to the start, before the first serve
+    def restart(self):
+        self.active = False
+        self.ball.place(self.center_x, self.center_y)
+        self.ball.vx = self.ball.speed
+        self.ball.vy = self.ball.speed
+
+    # The state the renderer needs, copied between cores as integers
+    def write_snapshot(self, snapshot):
+        snapshot[0] = self.ball.x
+        snapshot[1] = self.ball.y
+        snapshot[2] = self.p1
+        snapshot[3] = self.p2
+        snapshot[4] = self.score1
+        snapshot[5] = self.score2
+        snapshot[6] = self.active
+
+    def read_snapshot(self, snapshot):
+        self.ball.x = snapshot[0]
+        self.ball.y = snapshot[1]
+        self.p1 = snapshot[2]
+        self.p2 = snapshot[3]
+        self.score1 = snapshot[4]
+        self.score2 = snapshot[5]
+        self.active = snapshot[6]
+
+# Number of integers in a snapshot
+SNAPSHOT_SIZE = 7
+
+
+# Advance a game by one tick. p1 and p2 are each paddle's move this tick:
+# -1 up, 1 down or 0 to stay. Returns which player, if any, won a point.
+def step(state, p1, p2):
+    if not state.active:
+        return NO_POINT
+
+    if p1 < 0:
+        state.inc_p1()
+    elif p1 > 0:
+        state.dec_p1()
+    if p2 < 0:
+        state.inc_p2()
+    elif p2 > 0:
+        state.dec_p2()
+
+    score1 = state.score1
+    state.scored = False
+    state.move_ball()
+    if not state.scored:
+        return NO_POINT
+    return P1_POINT if state.score1 != score1 else P2_POINT
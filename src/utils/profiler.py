@@ -0,0 +1,156 @@
+import time
+from array import array
+
+# Phase indices, a frame's time is split between these
+PHASE_INPUT = 0
+PHASE_PHYSICS = 1
+PHASE_CLEAR = 2
+PHASE_DRAW = 3
+PHASE_PUSH = 4
+
+PHASES = ("input", "physics", "clear", "draw", "push")
+
+# Size of the overlay box in the top left corner of the screen
+OVERLAY_X = 1
+OVERLAY_Y = 1
+OVERLAY_W = 72
+OVERLAY_H = 9 * (len(PHASES) + 2) + 2
+
+# Running totals from add() wrap at 30 bits, to stay small ints
+TOTAL_MASK = 0x3fffffff
+
+class Profiler:
+    # Records how long each phase of a frame takes into a ring buffer of the
+    # last `frames` frames. Everything is preallocated, recording a sample is
+    # just a ticks_us() call and an addition.
+    #
+    #   profiler.begin()
+    #   ...read input...
+    #   profiler.end(PHASE_INPUT)
+    #   ...move things...
+    #   profiler.end(PHASE_PHYSICS)
+    #   profiler.frame()
+    #
+    # end() also restarts the timer, so consecutive phases can be chained.
+    def __init__(self, frames = 64, phases = PHASES):
+        self.phases = phases
+        self.frames = frames
+
+        self.samples = array("l", [0] * (frames * len(phases)))
+        self.frame_times = array("l", [0] * frames)
+        self.index = 0
+        self.filled = 0
+
+        # Time added from the other core, as running totals that only add()
+        # writes. frame() moves what has arrived since the last frame into
+        # the row it closes, so neither core clears what the other writes.
+        self.totals = array("l", [0] * len(phases))
+        self.totals_seen = array("l", [0] * len(phases))
+
+        self.mark_time = time.ticks_us()
+        self.frame_time = self.mark_time
+
+        # Whether the overlay is drawn, and whether it was drawn last frame
+        self.overlay = False
+        self.overlay_drawn = False
+        # Set once the overlay has been shown, i.e. someone was profiling
+        self.shown = False
+
+    def begin(self):
+        self.mark_time = time.ticks_us()
+
+    def end(self, phase):
+        now = time.ticks_us()
+        self.samples[self.index * len(self.phases) + phase] += time.ticks_diff(now, self.mark_time)
+        self.mark_time = now
+
+    # Add time measured elsewhere, e.g. by code running on the other core
+    # which can't share this profiler's timer. It is counted in the frame
+    # that is open when frame() next runs.
+    def add(self, phase, us):
+        self.totals[phase] = (self.totals[phase] + us) & TOTAL_MASK
+
+    # Close the current frame and start recording the next one
+    def frame(self):
+        now = time.ticks_us()
+        self.frame_times[self.index] = time.ticks_diff(now, self.frame_time)
+        self.frame_time = now
+
+        row = self.index * len(self.phases)
+        for phase in range(len(self.phases)):
+            total = self.totals[phase]
+            self.samples[row + phase] += (total - self.totals_seen[phase]) & TOTAL_MASK
+            self.totals_seen[phase] = total
+
+        self.index = (self.index + 1) % self.frames
+        if self.filled < self.frames:
+            self.filled += 1
+
+        row = self.index * len(self.phases)
+        for phase in range(len(self.phases)):
+            self.samples[row + phase] = 0
+
+    # Toggle the overlay when the buttons in mask have just been pressed
+    # together, returns True if it was toggled
+    def check_toggle(self, input, mask):
+        if input.pressed & mask and input.is_held(mask):
+            self.overlay = not self.overlay
+            return True
+        return False
+
+    def fps(self):
+        total = 0
+        for i in range(self.filled):
+            total += self.frame_times[i]
+        return 1000000 * self.filled // total if total else 0
+
+    def worst_frame(self):
+        worst = 0
+        for i in range(self.filled):
+            worst = max(worst, self.frame_times[i])
+        return worst
+
+    # The oldest complete frame and how many complete frames are recorded,
+    # the row at self.index is the frame still being recorded
+    def recorded(self):
+        if self.filled < self.frames:
+            return 0, self.filled
+        return (self.index + 1) % self.frames, self.frames - 1
+
+    def average(self, phase):
+        start, count = self.recorded()
+        if count == 0:
+            return 0
+
+        total = 0
+        for i in range(count):
+            total += self.samples[(start + i) % self.frames * len(self.phases) + phase]
+        return total // count
+
+    def draw_overlay(self, display, fg, bg):
+        display.set_pen(bg)
+        display.rectangle(OVERLAY_X, OVERLAY_Y, OVERLAY_W, OVERLAY_H)
+        display.set_pen(fg)
+
+        x = OVERLAY_X + 1
+        y = OVERLAY_Y + 1
+        display.text("fps {}".format(self.fps()), x, y, OVERLAY_W, 1)
+        display.text("max {}us".format(self.worst_frame()), x, y + 9, OVERLAY_W, 1)
+        for phase, name in enumerate(self.phases):
+            display.text("{} {}us".format(name, self.average(phase)), x, y + 18 + 9 * phase, OVERLAY_W, 1)
+
+        self.overlay_drawn = True
+        self.shown = True
+
+    # Write the recorded frames out, oldest first, as one line per frame
+    def dump(self, path):
+        with open(path, "w") as f:
+            f.write("frame," + ",".join(self.phases) + "\n")
+            start, count = self.recorded()
+            for i in range(count):
+                index = (start + i) % self.frames
+                row = index * len(self.phases)
+                f.write(str(self.frame_times[index]))
+                for phase in range(len(self.phases)):
+                    f.write("," + str(self.samples[row + phase]))
+                f.write("\n")
@@ -0,0 +1,60 @@
+class DirtyRegion:
+    # Collects the bounding box of everything drawn since the last push, so
+    # push() only sends that part of the framebuffer to the screen. Sending
+    # the whole 240x135 frame over SPI is most of what a UI step costs.
+    #
+    # PicoGraphics has partial_update() for every driver, but it silently
+    # does nothing on drivers that don't implement it, so partial pushes are
+    # only used when asked for (see utils.hardware.partial_update). Without
+    # them, and for regions that cover most of the screen anyway, a full
+    # update() is sent.
+    def __init__(self, display, partial = False, full_ratio = 3 / 4):
+        self.display = display
+        self.width, self.height = display.get_bounds()
+
+        self.partial = partial
+        # Past this fraction of the screen a full update is used
+        self.full_area = int(self.width * self.height * full_ratio)
+
+        self.pushes = 0
+        self.partial_pushes = 0
+        self.clear()
+
+    def clear(self):
+        self.left = self.width
+        self.top = self.height
+        self.right = 0
+        self.bottom = 0
+
+    def add(self, x, y, w, h):
+        self.left = max(0, min(self.left, x))
+        self.top = max(0, min(self.top, y))
+        self.right = min(self.width, max(self.right, x + w))
+        self.bottom = min(self.height, max(self.bottom, y + h))
+
+    def add_all(self):
+        self.left = 0
+        self.top = 0
+        self.right = self.width
+        self.bottom = self.height
+
+    def empty(self):
+        return self.right <= self.left or self.bottom <= self.top
+
+    # Send the changed region to the screen, returns False if nothing had
+    # changed
+    def push(self):
+        if self.empty():
+            return False
+
+        w = self.right - self.left
+        h = self.bottom - self.top
+        if self.partial and w * h < self.full_area:
+            self.display.partial_update(self.left, self.top, w, h)
+            self.partial_pushes += 1
+        else:
+            self.display.update()
+
+        self.pushes += 1
+        self.clear()
+        return True
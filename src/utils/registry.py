@@ -0,0 +1,101 @@
+import gc
+import os
+import sys
+import json
+
+import loader
+
+from . import boot
+from . import hardware
+
+# Modules in the source directory that are not games
+NOT_GAMES = ("main_menu", "settings", "loader")
+
+# Modules never unloaded, even when only a game uses them: dual_core's
+# worker thread holds the second core for good and can't be started twice
+RESIDENT = ("utils.dual_core",)
+
+class GameRegistry:
+    # Knows which games exist without touching them. The catalog comes from
+    # a manifest file instead of listing the filesystem, a game's module is
+    # only imported when it is launched, and it is thrown away again when
+    # its loop() returns so games never pile up in memory.
+    def __init__(self, manifest = "src/games.json", source = "src", history = 16):
+        self.manifest = manifest
+        self.source = source
+        self.games = self.load_manifest()
+
+        # Free heap after each game has been unloaded, newest last
+        self.history = history
+        self.heap_log = []
+
+    def load_manifest(self):
+        try:
+            with open(self.manifest) as f:
+                return json.load(f)["games"]
+        except (OSError, ValueError, KeyError):
+            # Missing or broken manifest, rebuild it once from the filesystem
+            return self.rescan()
+
+    def rescan(self):
+        games = sorted(file[:-3] for file in os.listdir(self.source) if file.endswith(".py") and file[:-3] not in NOT_GAMES)
+        # We want the settings option to be at the end of the list
+        games.append("settings")
+
+        try:
+            with open(self.manifest, "w") as f:
+                json.dump({"games": games}, f)
+        except OSError:
+            pass
+
+        self.games = games
+        return games
+
+    def launch(self, name):
+        loaded = set(sys.modules)
+        pens = hardware.palette.mark()
+
+        hardware.heap_report("before " + name)
+        try:
+            # Bytecode from host/build_mpy.py is used when it is current
+            loader.prepare(name)
+            boot.launch(name)
+            module = __import__(name)
+            boot.stage("import " + name)
+            module.loop()
+        finally:
+            hardware.palette.release_to(pens)
+            self.unload(loaded)
+            self.heap_log.append(hardware.heap_report("after " + name))
+            if len(self.heap_log) > self.history:
+                self.heap_log.pop(0)
+
+    # Drop every module imported since `loaded` was taken: the game, any
+    # game-only helpers and the utils modules only games use, like the
+    # physics and collision helpers. What the menu uses was loaded before.
+    def unload(self, loaded):
+        package = sys.modules["utils"]
+        for name in list(sys.modules):
+            if name in loaded or name in RESIDENT:
+                continue
+            if "." not in name:
+                del sys.modules[name]
+            elif name.startswith("utils."):
+                del sys.modules[name]
+                self.forget(package, name[6:])
+        gc.collect()
+
+    # Remove the references the utils package holds to one of its modules:
+    # the submodule itself and any names its __getattr__ cached from it.
+    # Goes through __dict__, getattr() would import the module again.
+    def forget(self, package, module):
+        names = package.__dict__
+        for name in [module] + [name for name in package.LAZY if package.LAZY[name] == module]:
+            if name in names:
+                del names[name]
+
+    def __len__(self):
+        return len(self.games)
+
+    def __getitem__(self, index):
+        return self.games[index]
@@ -0,0 +1,162 @@
+import time
+import random
+import struct
+
+# Recorded sessions. A session file is a header followed by the button
+# states sampled every tick, run-length encoded as (state, repeat count)
+# byte pairs:
+#
+#   4s  magic "PGIR"
+#   B   format version
+#   B   reserved
+#   H   tick length in ms
+#   I   seed the random module was given
+#
+# Replaying a file feeds the same states to the InputManager, with the same
+# random seed and a clock that advances one tick per sample, so a game makes
+# exactly the same moves as it did while recording and only the time it
+# takes to make them can differ.
+
+MAGIC = b"PGIR"
+VERSION = 1
+HEADER = "<4sBBHI"
+HEADER_SIZE = struct.calcsize(HEADER)
+
+# MicroPython tick counters wrap at 2**30
+TICKS_MAX = (1 << 30) - 1
+
+class ReplayFinished(Exception):
+    pass
+
+
+class Recorder:
+    # Records every state input.sample() reads until stop() is called. The
+    # session is kept in memory and only written to the file by stop(), so
+    # recording never waits on flash during play.
+    def __init__(self, input, path, seed = None, tick_ms = 10):
+        self.input = input
+        self.path = path
+        self.seed = (time.ticks_us() if seed is None else seed) & 0xffffffff
+        self.tick_ms = tick_ms
+
+        self.runs = bytearray()
+        self.state = 0
+        self.count = 0
+        self.ticks = 0
+
+        random.seed(self.seed)
+        input.source = self.read
+        input.clock = self.clock
+
+    def read(self):
+        state = self.input.read_state()
+        self.ticks += 1
+        if state == self.state and self.count < 255:
+            self.count += 1
+        else:
+            self.flush()
+            self.state = state
+            self.count = 1
+        return state
+
+    def clock(self):
+        return (self.ticks * self.tick_ms) & TICKS_MAX
+
+    def flush(self):
+        if self.count:
+            self.runs.append(self.state)
+            self.runs.append(self.count)
+            self.count = 0
+
+    def stop(self):
+        self.flush()
+        self.input.source = self.input.read_state
+        self.input.clock = time.ticks_ms
+
+        with open(self.path, "wb") as f:
+            f.write(struct.pack(HEADER, MAGIC, VERSION, 0, self.tick_ms, self.seed))
+            f.write(self.runs)
+        return self.ticks
+
+
+class Replay:
+    # Plays a recorded session back through input.sample(). Once the
+    # recording runs out the real buttons take over again, or with
+    # live_after False ReplayFinished is raised from the next sample, which
+    # is how host runs end a game that never exits by itself.
+    def __init__(self, input, path, live_after = True):
+        self.input = input
+        self.live_after = live_after
+
+        with open(path, "rb") as f:
+            data = f.read()
+
+        magic, version, reserved, self.tick_ms, self.seed = struct.unpack(HEADER, data[:HEADER_SIZE])
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("not a session recording: " + path)
+
+        self.runs = data[HEADER_SIZE:]
+        self.position = 0
+        self.state = 0
+        self.remaining = 0
+        self.ticks = 0
+        self.finished = False
+
+        random.seed(self.seed)
+        input.source = self.read
+        input.clock = self.clock
+
+    def read(self):
+        if self.remaining == 0:
+            if self.position >= len(self.runs):
+                self.finished = True
+                self.stop()
+                if not self.live_after:
+                    raise ReplayFinished()
+                return self.input.source()
+
+            self.state = self.runs[self.position]
+            self.remaining = self.runs[self.position + 1]
+            self.position += 2
+
+        self.remaining -= 1
+        self.ticks += 1
+        return self.state
+
+    def clock(self):
+        return (self.ticks * self.tick_ms) & TICKS_MAX
+
+    def stop(self):
+        self.input.source = self.input.read_state
+        self.input.clock = time.ticks_ms
+        return self.ticks
+
+
+# Helpers for the REPL or a game's loop(), on the shared hardware input:
+#
+#   from utils import replay
+#   replay.record("pong.rec")
+#   import pong; pong.loop()
+#   replay.stop()
+
+session = None
+
+def record(path, seed = None, tick_ms = 10):
+    global session
+    from .hardware import input
+    session = Recorder(input, path, seed, tick_ms)
+    return session
+
+def play(path, live_after = True):
+    global session
+    from .hardware import input
+    session = Replay(input, path, live_after)
+    return session
+
+def stop():
+    global session
+    ticks = 0
+    if session is not None:
+        ticks = session.stop()
+        session = None
+    return ticks
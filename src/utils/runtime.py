@@ -0,0 +1,70 @@
+import time
+
+try:
+    import asyncio
+except ImportError:
+    import uasyncio as asyncio
+
+# MicroPython's asyncio sleeps in milliseconds natively
+if hasattr(asyncio, "sleep_ms"):
+    sleep_ms = asyncio.sleep_ms
+else:
+    def sleep_ms(ms):
+        return asyncio.sleep(ms / 1000)
+
+class Runtime:
+    # Cooperative scheduler for things that happen on their own timers, like
+    # polling input, scrolling text and animating the LED. Each callback
+    # registered with every() runs as its own asyncio task on a fixed period
+    # and the scheduler sleeps until the next one is due, instead of spinning
+    # in a loop. Any callback can end the run with stop(result). An exception
+    # raised by a callback also ends the run, and is raised again from run().
+    def __init__(self):
+        self.periodic = []
+        self.result = None
+        self.error = None
+        self.stopped = None
+
+    def every(self, period_ms, callback):
+        self.periodic.append((period_ms, callback))
+
+    def stop(self, result = None):
+        self.result = result
+        self.stopped.set()
+
+    async def repeat(self, period_ms, callback):
+        due = time.ticks_ms()
+        while not self.stopped.is_set():
+            try:
+                callback()
+            except Exception as e:
+                # Left in the task it would be lost and run() would never end
+                self.error = e
+                self.stopped.set()
+                return
+
+            due = time.ticks_add(due, period_ms)
+            delay = time.ticks_diff(due, time.ticks_ms())
+            if delay < 0:
+                # Fell behind, skip the missed periods rather than bunching up
+                due = time.ticks_ms()
+                delay = 0
+            await sleep_ms(delay)
+
+    async def main(self):
+        self.stopped = asyncio.Event()
+        tasks = [asyncio.create_task(self.repeat(period, callback)) for period, callback in self.periodic]
+
+        await self.stopped.wait()
+
+        for task in tasks:
+            task.cancel()
+
+    # Run every task until one of them calls stop(), returns its result
+    def run(self):
+        self.result = None
+        self.error = None
+        asyncio.run(self.main())
+        if self.error is not None:
+            raise self.error
+        return self.result
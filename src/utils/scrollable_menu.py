@@ -1,6 +1,9 @@
-from pimoroni import Button
 from .interactable import Interactible
-import time
+from .text_cache import TextCache
+from .profiler import PHASE_CLEAR, PHASE_DRAW, PHASE_PUSH
+from .profiler import OVERLAY_X, OVERLAY_Y, OVERLAY_W, OVERLAY_H
+from .runtime import Runtime
+from .region import DirtyRegion
 
 class ScrollableMenu(Interactible):
     
@@ -10,18 +13,36 @@ class ScrollableMenu(Interactible):
         # The font is 7 * font_size pixels high
         return self.font_size * 7 + 2 * self.text_padding_around
 
-    def __init__(self, display, items = [], btn_prev = 15, btn_next = 14, btn_sel = 12, btn_exit = 13, color_bg = [0, 0, 0], color_fg = [255, 255, 255], color_hl = [30, 30, 30], color_hl_fg = [255, 255, 255], color_scrollbar = [255, 0, 0], color_scrollbar_bg = [30, 30, 30], hscroll_timeout = 50, scrollbar_width = 4):
+    def __init__(self, display, items = [], btn_prev = 15, btn_next = 14, btn_sel = 12, btn_exit = 13, color_bg = [0, 0, 0], color_fg = [255, 255, 255], color_hl = [30, 30, 30], color_hl_fg = [255, 255, 255], color_scrollbar = [255, 0, 0], color_scrollbar_bg = [30, 30, 30], hscroll_timeout = 50, scrollbar_width = 4, text_cache = None, input = None, profiler = None, partial_update = False):
         # Set up attributes
         self.display = display
+        # Buttons are read from this InputManager's samples when given
+        self.input = input
+        # Drawing is timed with this Profiler when given
+        self.profiler = profiler
+        self.text_cache = text_cache or TextCache(display)
+        # Only the part of the screen that was redrawn gets pushed, with
+        # partial_update() if the display's driver supports it
+        self.region = DirtyRegion(display, partial_update)
+        # Where the scrollbar thumb was last drawn
+        self.drawn_thumb = None
 
         self.font_size = 3
-        # The time between hoizontal scroll stop and restart
+        # How long long items rest at either end of their horizontal scroll,
+        # in hundredths of a second
         self.hscroll_timeout = hscroll_timeout
+        # Long items scroll smoothly by this many pixels every marquee period
+        self.hscroll_pixels = 2
+        self.marquee_period = 40
+        self.hscroll_pause = 10 * hscroll_timeout // self.marquee_period
+        # How often buttons are polled, in milliseconds
+        self.poll_period = 10
         self.vscroll_offset = 0
         self.scrollbar_width = scrollbar_width
 
         self.active_scrolling = False
-        self.scroll_text = ""
+        self.scroll_offset = 0
+        self.scroll_width = 0
         self.scroll_countdown = 0
 
         # Create managed attributes for display colors
@@ -62,90 +83,206 @@ class ScrollableMenu(Interactible):
     def clear(self, update = True):
         self.display.set_pen(self.bg)
         self.display.clear()
+        self.region.add_all()
 
         if update:
-            self.display.update()
+            self.region.push()
         
         self.display.set_pen(self.fg)
     
-    def draw_list(self):
+    def update_scroll_offset(self):
         # We want to have the view scroll when the cursor gets halfway down the screen
         if self.line_space * (self.selected_index + 1) > self.Y // 2:
             # We achieve the scroll effect by applying a negative offset to the Y index
             self.vscroll_offset = (self.Y // 2) - (self.line_space * self.selected_index) - self.line_space // 2 + self.text_padding_around + 1
         else:
             self.vscroll_offset = 0
-        
+
+    # The range of item indices that are at least partly on screen
+    def visible_range(self):
+        first = max(0, -self.vscroll_offset // self.line_space)
+        last = min(len(self.items), (self.Y - self.vscroll_offset) // self.line_space + 1)
+        return range(first, last)
+
+    def draw_list(self):
+        if self.profiler is not None:
+            self.profiler.begin()
+
+        self.update_scroll_offset()
         self.clear(False)
 
+        if self.profiler is not None:
+            self.profiler.end(PHASE_CLEAR)
+
         # Only draw the scrollbar if it's needed
         self._line_start = self.line_start
         if self.scrollbar_width > 0 and len(self.items) * self.line_space > self.Y:
-            scrollbar_height = self.Y // len(self.items)
-            self.display.set_pen(self.color_scrollbar_bg)
-            self.display.rectangle(0, 0, self.scrollbar_width, self.Y)
-            self.display.set_pen(self.color_scrollbar)
-            self.display.rectangle(0, self.selected_index * scrollbar_height, self.scrollbar_width, scrollbar_height)
+            self.draw_scrollbar()
         elif self.scrollbar_width > 0:
             self._line_start = 2
 
-        self.display.set_pen(self.fg)
-        for index in range(0, len(self.items)):
-            if index == self.selected_index:
-                self.display.set_pen(self.hl)
-                text_length = self.text_padding_around + self.display.measure_text(self.items[index], self.font_size)
-                self.display.rectangle(self._line_start, self.line_space * index + self.vscroll_offset, text_length, self.line_space)
-                self.display.set_pen(self.hl_fg)
-
-                if text_length > self.X - self._line_start:
-                    self.active_scrolling = True
-                    self.scroll_text = self.items[index]
-                    self.scroll_countdown = self.hscroll_timeout
-                else:
-                    self.active_scrolling = False
+        # Items scrolled out of view are skipped entirely
+        for index in self.visible_range():
+            self.draw_item(index, False)
+        self.present()
+
+    # Push the frame to the screen, with the profiler overlay on top if shown
+    def present(self):
+        profiler = self.profiler
+        if profiler is not None:
+            profiler.end(PHASE_DRAW)
+            if profiler.overlay:
+                profiler.draw_overlay(self.display, self.fg, self.bg)
+                self.region.add(OVERLAY_X, OVERLAY_Y, OVERLAY_W, OVERLAY_H)
+                profiler.begin()
+
+        self.region.push()
+
+        if profiler is not None:
+            profiler.end(PHASE_PUSH)
+            profiler.frame()
+
+    def draw_scrollbar(self):
+        scrollbar_height = self.Y // len(self.items)
+        self.display.set_pen(self.color_scrollbar_bg)
+        self.display.rectangle(0, 0, self.scrollbar_width, self.Y)
+        self.display.set_pen(self.color_scrollbar)
+        thumb = self.selected_index * scrollbar_height
+        self.display.rectangle(0, thumb, self.scrollbar_width, scrollbar_height)
+
+        # Only the old and new thumb positions actually look different
+        previous = self.drawn_thumb if self.drawn_thumb is not None else thumb
+        self.region.add(0, min(previous, thumb), self.scrollbar_width, abs(thumb - previous) + scrollbar_height)
+        self.drawn_thumb = thumb
+
+    def draw_item(self, index, erase = True):
+        top = self.line_space * index + self.vscroll_offset
+        self.region.add(self._line_start, top, 1 + self.X - self._line_start, self.line_space)
+
+        if erase:
+            self.display.set_pen(self.bg)
+            self.display.rectangle(self._line_start, top, 1 + self.X - self._line_start, self.line_space)
+
+        if index == self.selected_index:
+            self.display.set_pen(self.hl)
+            text_width = self.text_cache.measure(self.items[index], self.font_size)
+            text_length = self.text_padding_around + text_width
+            self.display.rectangle(self._line_start, top, text_length, self.line_space)
+            self.display.set_pen(self.hl_fg)
+
+            if text_length > self.X - self._line_start:
+                self.active_scrolling = True
+                self.scroll_offset = 0
+                self.scroll_width = text_width
+                self.scroll_countdown = self.hscroll_pause
             else:
-            	self.display.set_pen(self.fg)
-            self.display.text(self.items[index], self.text_padding_around + self._line_start, self.text_padding_around + self.line_space * index + self.vscroll_offset, 10 * self.Y, self.font_size)
-        self.display.update()
+                self.active_scrolling = False
+        else:
+            self.display.set_pen(self.fg)
+        self.display.text(self.items[index], self.text_padding_around + self._line_start, self.text_padding_around + top, 10 * self.Y, self.font_size)
+
+    # Move the cursor by delta items, only repainting the rows that changed
+    # unless the view itself has to scroll
+    def move_cursor(self, delta):
+        index = self.selected_index + delta
+        if index < 0 or index >= len(self.items):
+            return False
+
+        previous = self.selected_index
+        offset = self.vscroll_offset
+        self.selected_index = index
+        self.update_scroll_offset()
+
+        if self.vscroll_offset != offset:
+            self.draw_list()
+            return True
+
+        if self.profiler is not None:
+            self.profiler.begin()
+
+        self.draw_item(previous)
+        self.draw_item(index)
+        if self._line_start != 2 and self.scrollbar_width > 0:
+            self.draw_scrollbar()
+        self.present()
+        return True
+
+    # X + Y together shows or hides the profiler overlay
+    def toggle_overlay(self):
+        if self.profiler is None or self.input is None:
+            return False
+        return self.profiler.check_toggle(self.input, self._next | self._prev)
     
+    # One marquee step, called every marquee_period. The highlighted item is
+    # drawn shifted left by scroll_offset pixels inside a clip window over
+    # its row, so the string itself is never sliced or measured again.
+    # scroll_countdown is the number of periods to wait before moving.
     def do_text_scroll(self):
         if self.scroll_countdown > 0:
             self.scroll_countdown -= 1
+            return
+
+        left = self._line_start
+        top = self.line_space * self.selected_index + self.vscroll_offset
+        width = 1 + self.X - left
+
+        # How far the text has to move for its end to come into view
+        overflow = self.text_padding_around + self.scroll_width - (self.X - left)
+
+        if self.scroll_offset >= overflow:
+            # Jump back to the start and rest there
+            self.scroll_offset = 0
+            self.scroll_countdown = self.hscroll_pause
         else:
-            self.display.set_pen(self.hl)
-            text_length = self.text_padding_around + self.display.measure_text(self.scroll_text, self.font_size)
-            self.display.rectangle(self._line_start, self.line_space * self.selected_index + self.vscroll_offset, 1 + self.X - self.line_start, self.line_space)
-            self.display.set_pen(self.hl_fg)
-            self.display.text(self.scroll_text, self.text_padding_around + self._line_start, self.text_padding_around + self.line_space * self.selected_index + self.vscroll_offset, 10 * self.Y, self.font_size)
+            self.scroll_offset += self.hscroll_pixels
+            if self.scroll_offset >= overflow:
+                # Rest on the end of the text before starting over
+                self.scroll_offset = overflow
+                self.scroll_countdown = self.hscroll_pause
 
-            if text_length > self.X - self._line_start:
-                self.scroll_text = self.scroll_text[1:]
-                self.scroll_countdown = self.hscroll_timeout
-            else:
-                self.scroll_text = self.items[self.selected_index]
-                self.scroll_countdown = 3 * self.hscroll_timeout
-            
-            self.display.update()
-    
-    def get_selection(self):
+        self.display.set_clip(left, top, width, self.line_space)
+        self.display.set_pen(self.hl)
+        self.display.rectangle(left, top, width, self.line_space)
+        self.display.set_pen(self.hl_fg)
+        self.display.text(self.items[self.selected_index], self.text_padding_around + left - self.scroll_offset, self.text_padding_around + top, 10 * self.Y, self.font_size)
+        self.display.remove_clip()
+
+        self.region.add(left, top, width, self.line_space)
+        self.region.push()
+
+    # Show the menu until an item is selected, returns its index or False if
+    # the menu was exited. Polling the buttons and scrolling long items run
+    # as separate timed tasks, extra (period_ms, callback) tasks such as LED
+    # effects can be run alongside them with background.
+    def get_selection(self, background = ()):
         self.draw_list()
 
-        while True:
-            if self.btn_next:
-                if self.selected_index > 0:
-                    self.selected_index -= 1
-                    self.draw_list()
-            elif self.btn_prev:
-                if self.selected_index < len(self.items) - 1:
-                    self.selected_index += 1
-                    self.draw_list()
-            elif self.btn_sel:
-                return self.selected_index
-            elif self.btn_exit:
-                return False
-            elif self.active_scrolling:
-                self.do_text_scroll()
-            time.sleep(0.01)
+        self.runtime = Runtime()
+        self.runtime.every(self.poll_period, self.poll_buttons)
+        self.runtime.every(self.marquee_period, self.scroll_step)
+        for period, callback in background:
+            self.runtime.every(period, callback)
+
+        return self.runtime.run()
+
+    def poll_buttons(self):
+        if self.input is not None:
+            self.input.sample()
+
+        if self.toggle_overlay():
+            self.draw_list()
+        elif self.btn_next:
+            self.move_cursor(-1)
+        elif self.btn_prev:
+            self.move_cursor(1)
+        elif self.btn_sel:
+            self.runtime.stop(self.selected_index)
+        elif self.btn_exit:
+            self.runtime.stop(False)
+
+    def scroll_step(self):
+        if self.active_scrolling:
+            self.do_text_scroll()
 
     def __setitem__(self, key, value):
         setattr(self, key, value)
@@ -0,0 +1,82 @@
+import os
+import json
+
+# Every setting, with the value it has until the user changes it
+DEFAULTS = {
+    # Backlight while playing a game, and in the menus
+    "brightness": 0.5,
+    "menu_brightness": 1.0,
+}
+
+class SettingsStore:
+    # Settings are read from the file once and then kept as plain attributes,
+    # so a game reads settings.brightness for the cost of an attribute lookup.
+    #
+    # set() only changes the value in memory and marks the key dirty.
+    # commit() writes every dirty value in one go, into a temporary file that
+    # is then renamed over the old one, so a reset halfway through a write
+    # never leaves a broken settings file. The settings screen commits when
+    # it is left, so dragging a slider around never touches flash.
+    def __init__(self, path = "src/settings.json", defaults = DEFAULTS):
+        self.path = path
+        self.keys = tuple(defaults)
+
+        # Values as they are in the file, and keys that differ from it
+        self.saved = dict(defaults)
+        self.dirty = set()
+        self.commits = 0
+
+        self.load()
+        for key in self.keys:
+            setattr(self, key, self.saved[key])
+
+    def load(self):
+        try:
+            with open(self.path) as f:
+                values = json.load(f)
+        except (OSError, ValueError):
+            # No settings saved yet, or a broken file, use the defaults
+            return
+
+        for key in self.keys:
+            if key in values:
+                self.saved[key] = values[key]
+
+    def get(self, key):
+        return getattr(self, key)
+
+    def set(self, key, value):
+        setattr(self, key, value)
+        if value == self.saved[key]:
+            # Changed back, nothing to write for this key any more
+            self.dirty.discard(key)
+        else:
+            self.dirty.add(key)
+
+    # Write the dirty values, returns False if there was nothing to write
+    def commit(self):
+        if not self.dirty:
+            return False
+
+        for key in self.dirty:
+            self.saved[key] = getattr(self, key)
+
+        temp = self.path + ".tmp"
+        with open(temp, "w") as f:
+            json.dump(self.saved, f)
+
+        try:
+            os.rename(temp, self.path)
+        except OSError:
+            # Not every filesystem will rename over an existing file
+            os.remove(self.path)
+            os.rename(temp, self.path)
+
+        self.dirty = set()
+        self.commits += 1
+        return True
+
+
+# Loaded once when utils.settings_store is first imported, the menu and
+# every game share it
+settings = SettingsStore()
@@ -1,35 +1,55 @@
-from pimoroni import Button
-from utils import Interactible
-import time
+from .interactable import Interactible
+from .runtime import Runtime
+from .region import DirtyRegion
 
 class SliderOption(Interactible):
     @property
     def next(self):
-        if self.value + self.step > self.end:
+        if self.position + 1 > self.steps:
             return None
-        
-        self.value += self.step
+
+        self.position += 1
         return self.value
-    
+
     @property
     def previous(self):
-        if self.value - self.step < self.start:
+        if self.position - 1 < 0:
             return None
-        
-        self.value -= self.step
+
+        self.position -= 1
         return self.value
 
-    def __init__(self, display, slider_range = [0, 1, 0.1], default = 0.5, btn_inc = 15, btn_dec = 14, btn_sel = 12, btn_exit = 13, color_bg = [0, 0, 0], color_fg = [255, 255, 255], color_slider = [30, 30, 30], color_selector = [0, 255, 0], color_endpoint = [255, 0, 255]):
+    # Worked out from the step position so repeated steps don't pile up
+    # floating point error
+    @property
+    def value(self):
+        return round(self.start + self.position * self.step, 6)
+
+    def __init__(self, display, slider_range = [0, 1, 0.1], default = 0.5, btn_inc = 15, btn_dec = 14, btn_sel = 12, btn_exit = 13, color_bg = [0, 0, 0], color_fg = [255, 255, 255], color_slider = [30, 30, 30], color_selector = [0, 255, 0], color_endpoint = [255, 0, 255], input = None, label = "", store = None, key = None, on_change = None, partial_update = False):
         # Set up attributes
         self.display = display
+        # Buttons are read from this InputManager's samples when given
+        self.input = input
 
         self.font_size = 3
-        
+        self.label = label
+
         self.start = slider_range[0]
         self.end = slider_range[1]
         self.step = slider_range[2]
 
-        self.value = default
+        self.steps = round((self.end - self.start) / self.step)
+        self.position = min(self.steps, max(0, round((default - self.start) / self.step)))
+
+        # Every change is set in the store under key, which only marks it
+        # dirty, the store is written when the settings screen is left
+        self.store = store
+        self.key = key
+        # Called with the new value on every change, e.g. to preview it
+        self.on_change = on_change
+
+        # How often buttons are polled, in milliseconds
+        self.poll_period = 10
 
         self.button_property("btn_inc", "_next")
         self.button_property("btn_dec", "_prev")
@@ -38,9 +58,151 @@ class SliderOption(Interactible):
 
         self.btn_inc = btn_inc
         self.btn_dec = btn_dec
+        self.btn_save = btn_sel
+        self.btn_cancel = btn_exit
 
         self.color_property("color_fg", "_fg")
         self.color_property("color_bg", "_bg")
         self.color_property("color_slider", "_slider")
         self.color_property("color_selector", "_selector")
-        self.color_property("color_endpoint", "_endpoint")
\ No newline at end of file
+        self.color_property("color_endpoint", "_endpoint")
+
+        self.color_fg = color_fg
+        self.color_bg = color_bg
+        self.color_slider = color_slider
+        self.color_selector = color_selector
+        self.color_endpoint = color_endpoint
+
+        X, Y = display.get_bounds()
+        self.X = X - 1
+        self.Y = Y - 1
+
+        # Layout: the track runs between two endpoint bars across the middle
+        # of the screen, the thumb slides along it and the value is shown
+        # centered below
+        self.track_left = 20
+        self.track_right = self.X - 20
+        self.track_y = self.Y // 2
+        self.track_h = 6
+        self.thumb_w = 8
+        self.thumb_h = 20
+        self.endpoint_w = 4
+        self.endpoint_h = 16
+        self.value_y = self.track_y + self.thumb_h // 2 + 6
+
+        # Only the parts of the screen that were redrawn get pushed, with
+        # partial_update() if the display's driver supports it
+        self.region = DirtyRegion(display, partial_update)
+        self.drawn_position = self.position
+        self.drawn_value_width = 0
+
+    # The left edge of the thumb at a step position
+    def thumb_x(self, position):
+        return self.track_left + position * (self.track_right - self.track_left) // self.steps - self.thumb_w // 2
+
+    def draw(self):
+        display = self.display
+        display.set_pen(self._bg)
+        display.clear()
+        self.region.add_all()
+
+        display.set_pen(self._fg)
+        display.text(self.label, 4, 4, 10 * self.X, 2)
+        display.text(str(self.start), self.track_left - 8, self.track_y + self.endpoint_h // 2 + 2, self.X, 1)
+        end = str(self.end)
+        display.text(end, self.track_right + 8 - display.measure_text(end, 1), self.track_y + self.endpoint_h // 2 + 2, self.X, 1)
+
+        self.draw_track(0, self.X)
+        self.draw_thumb()
+        self.draw_value()
+        self.region.push()
+
+    # Repaint the track and endpoints between two x positions
+    def draw_track(self, left, right):
+        display = self.display
+        left = max(left, self.track_left)
+        right = min(right, self.track_right)
+        if right > left:
+            display.set_pen(self._slider)
+            display.rectangle(left, self.track_y - self.track_h // 2, right - left, self.track_h)
+
+        display.set_pen(self._endpoint)
+        for x in (self.track_left - self.endpoint_w, self.track_right):
+            if x < right + self.endpoint_w and x + self.endpoint_w > left - self.endpoint_w:
+                display.rectangle(x, self.track_y - self.endpoint_h // 2, self.endpoint_w, self.endpoint_h)
+
+    def draw_thumb(self):
+        x = self.thumb_x(self.position)
+        top = self.track_y - self.thumb_h // 2
+        self.display.set_pen(self._selector)
+        self.display.rectangle(x, top, self.thumb_w, self.thumb_h)
+        self.region.add(x, top, self.thumb_w, self.thumb_h)
+        self.drawn_position = self.position
+
+    def erase_thumb(self):
+        x = self.thumb_x(self.drawn_position)
+        top = self.track_y - self.thumb_h // 2
+        self.display.set_pen(self._bg)
+        self.display.rectangle(x, top, self.thumb_w, self.thumb_h)
+        self.draw_track(x, x + self.thumb_w)
+        self.region.add(x, top, self.thumb_w, self.thumb_h)
+
+    def draw_value(self):
+        display = self.display
+        height = 7 * self.font_size
+        center = (self.X + 1) // 2
+
+        # Erase the previous value first, it may have been wider
+        width = self.drawn_value_width
+        display.set_pen(self._bg)
+        display.rectangle(center - width // 2, self.value_y, width, height)
+        self.region.add(center - width // 2, self.value_y, width, height)
+
+        text = str(self.value)
+        width = display.measure_text(text, self.font_size)
+        display.set_pen(self._fg)
+        display.text(text, center - width // 2, self.value_y, self.X, self.font_size)
+        self.region.add(center - width // 2, self.value_y, width, height)
+        self.drawn_value_width = width
+
+    # Repaint only what a new value changes: the thumb's old and new spots
+    # and the value label
+    def changed(self):
+        value = self.value
+        if self.store is not None:
+            self.store.set(self.key, value)
+        if self.on_change is not None:
+            self.on_change(value)
+
+        self.erase_thumb()
+        self.draw_thumb()
+        self.draw_value()
+        self.region.push()
+
+    # Show the slider until A saves or B cancels, returns the chosen value or
+    # None if cancelled. Cancelling puts the starting value back.
+    def get_value(self):
+        self.initial = self.position
+        self.draw()
+
+        self.runtime = Runtime()
+        self.runtime.every(self.poll_period, self.poll_buttons)
+        return self.runtime.run()
+
+    def poll_buttons(self):
+        if self.input is not None:
+            self.input.sample()
+
+        if self.btn_inc:
+            if self.next is not None:
+                self.changed()
+        elif self.btn_dec:
+            if self.previous is not None:
+                self.changed()
+        elif self.btn_save:
+            self.runtime.stop(self.value)
+        elif self.btn_cancel:
+            if self.position != self.initial:
+                self.position = self.initial
+                self.changed()
+            self.runtime.stop(None)
@@ -0,0 +1,75 @@
+try:
+    from collections import OrderedDict
+except ImportError:
+    from ucollections import OrderedDict
+
+class TextCache:
+    # Memoizes display.measure_text so text that is drawn every frame is only
+    # measured once. Each font size keeps its own least recently used table
+    # of at most `capacity` strings, and strings registered with prepare()
+    # (fixed prompts, digits) are kept for as long as the cache lives.
+    def __init__(self, display, capacity = 32, numbers = 100):
+        self.display = display
+        self.capacity = capacity
+
+        self.widths = {}
+        self.prepared = {}
+        # Strings for 0 up to numbers - 1, built on first use
+        self.numbers = [None] * numbers
+
+        self.hits = 0
+        self.misses = 0
+
+    def measure(self, text, size):
+        prepared = self.prepared.get(size)
+        if prepared is not None and text in prepared:
+            self.hits += 1
+            return prepared[text]
+
+        widths = self.widths.get(size)
+        if widths is None:
+            widths = self.widths[size] = OrderedDict()
+        elif text in widths:
+            self.hits += 1
+            # Move the entry to the most recently used end
+            width = widths[text] = widths.pop(text)
+            return width
+
+        self.misses += 1
+        width = widths[text] = self.display.measure_text(text, size)
+        if len(widths) > self.capacity:
+            del widths[next(iter(widths))]
+        return width
+
+    # Measure text once and keep it out of LRU eviction
+    def prepare(self, text, size):
+        prepared = self.prepared.get(size)
+        if prepared is None:
+            prepared = self.prepared[size] = {}
+        elif text in prepared:
+            self.hits += 1
+            return prepared[text]
+
+        self.misses += 1
+        width = prepared[text] = self.display.measure_text(text, size)
+        return width
+
+    # Small counters are drawn every frame, so their strings are built once
+    # rather than with str() on each draw. Only a fixed range is kept, as
+    # the cache lives as long as the device is on, anything outside it is
+    # built with str() each time.
+    def number(self, value):
+        if value < 0 or value >= len(self.numbers):
+            return str(value)
+        text = self.numbers[value]
+        if text is None:
+            text = self.numbers[value] = str(value)
+        return text
+
+    def stats(self):
+        return self.hits, self.misses
+
+    def clear(self):
+        self.widths = {}
+        self.prepared = {}
+        self.numbers = [None] * len(self.numbers)
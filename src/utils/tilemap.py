@@ -0,0 +1,141 @@
+from array import array
+
+class TileMap:
+    # A grid of tiles drawn on the display. Each cell holds a tile id in a
+    # bytearray, and cells that change are flagged in a dirty bitset so
+    # render() only redraws those instead of the whole grid.
+    #
+    # Tiles are defined once with define(). A tile is either a solid block
+    # of colour or a bitmap, which is turned into a list of pixel spans when
+    # it is defined so drawing it later is just a few pixel_span calls.
+    def __init__(self, display, cols, rows, tile_w, tile_h, x = 0, y = 0):
+        self.display = display
+        self.cols = cols
+        self.rows = rows
+        self.tile_w = tile_w
+        self.tile_h = tile_h
+        self.x = x
+        self.y = y
+
+        self.grid = bytearray(cols * rows)
+        self.dirty = bytearray((cols * rows + 7) // 8)
+        # Range of dirty bytes to scan, empty when low > high
+        self.dirty_low = len(self.dirty)
+        self.dirty_high = -1
+
+        # Per tile id: pen, background pen and bitmap spans (None if solid)
+        self.pens = [0] * 256
+        self.backgrounds = [0] * 256
+        self.spans = [None] * 256
+
+    # bitmap is a list of tile_h ints, one per row of pixels, with the most
+    # significant of the tile_w bits being the leftmost pixel
+    def define(self, tile, pen, background = 0, bitmap = None):
+        self.pens[tile] = pen
+        self.backgrounds[tile] = background
+
+        if bitmap is None:
+            self.spans[tile] = None
+        else:
+            # Flattened (x, y, length) runs of set pixels
+            spans = []
+            for dy, bits in enumerate(bitmap):
+                dx = 0
+                while dx < self.tile_w:
+                    if bits & (1 << (self.tile_w - 1 - dx)):
+                        start = dx
+                        while dx < self.tile_w and bits & (1 << (self.tile_w - 1 - dx)):
+                            dx += 1
+                        spans.extend((start, dy, dx - start))
+                    else:
+                        dx += 1
+            self.spans[tile] = array("h", spans)
+
+        # Cells already showing this tile have to be drawn again
+        for index in range(len(self.grid)):
+            if self.grid[index] == tile:
+                self.mark_index(index)
+
+    def get(self, col, row):
+        return self.grid[row * self.cols + col]
+
+    def set(self, col, row, tile):
+        index = row * self.cols + col
+        if self.grid[index] != tile:
+            self.grid[index] = tile
+            self.mark_index(index)
+
+    def fill(self, tile):
+        for index in range(len(self.grid)):
+            self.grid[index] = tile
+        self.mark_all()
+
+    def mark_index(self, index):
+        byte = index >> 3
+        self.dirty[byte] |= 1 << (index & 7)
+        if byte < self.dirty_low:
+            self.dirty_low = byte
+        if byte > self.dirty_high:
+            self.dirty_high = byte
+
+    def mark(self, col, row):
+        self.mark_index(row * self.cols + col)
+
+    def mark_row(self, row):
+        start = row * self.cols
+        for index in range(start, start + self.cols):
+            self.mark_index(index)
+
+    def mark_all(self):
+        for byte in range(len(self.dirty)):
+            self.dirty[byte] = 0xff
+        self.dirty_low = 0
+        self.dirty_high = len(self.dirty) - 1
+
+    def draw_index(self, index):
+        tile = self.grid[index]
+        left = self.x + (index % self.cols) * self.tile_w
+        top = self.y + (index // self.cols) * self.tile_h
+        display = self.display
+
+        spans = self.spans[tile]
+        if spans is None:
+            display.set_pen(self.pens[tile])
+            display.rectangle(left, top, self.tile_w, self.tile_h)
+            return
+
+        display.set_pen(self.backgrounds[tile])
+        display.rectangle(left, top, self.tile_w, self.tile_h)
+        display.set_pen(self.pens[tile])
+        for i in range(0, len(spans), 3):
+            display.pixel_span(left + spans[i], top + spans[i + 1], spans[i + 2])
+
+    # Draw every changed cell, returns how many were drawn. Pushing the
+    # frame to the screen is left to the caller.
+    def render(self):
+        drawn = 0
+        cells = len(self.grid)
+        dirty = self.dirty
+
+        for byte in range(self.dirty_low, self.dirty_high + 1):
+            bits = dirty[byte]
+            if not bits:
+                continue
+            dirty[byte] = 0
+
+            index = byte << 3
+            while bits:
+                if bits & 1 and index < cells:
+                    self.draw_index(index)
+                    drawn += 1
+                bits >>= 1
+                index += 1
+
+        self.dirty_low = len(dirty)
+        self.dirty_high = -1
+        return drawn
+
+    # Draw every cell whether it changed or not
+    def render_all(self):
+        self.mark_all()
+        return self.render()